@@ -3,11 +3,70 @@
 import frappe
 # JSON is used for parsing incoming data if needed
 import json
-# Datetime is used for parsing and formatting date strings from Google Forms
-from datetime import datetime
+# namedtuple holds the outcome of a bulk Camp Settings insert
+from collections import namedtuple
+# Compiled Camp Settings mapper (type coercion, date parsing, unknown-field reporting)
+from camp_manager.api.payload_mapper import get_mapper
+# Cached, constant-time verification of the webhook secret token
+from camp_manager.api.tokens import is_valid_token
+# Wall time / query counters for the webhook endpoints (see get_hook_stats)
+from camp_manager.instrumentation import instrument
+# Change log entries for the Camps linked with a direct UPDATE
+from camp_manager.change_log import record_updates
+# The bulk writes skip the hooks that drop cached organization identities
+from camp_manager.identity import clear_after_commit
+# App logger for webhook diagnostics
+from camp_manager.logger import get_logger
+
+
+log = get_logger("create_entry")
+
+
+# Number of times a stored Google Form submission is processed before it is moved to "Dead Letter"
+MAX_INTAKE_ATTEMPTS = 5
+# Queued/Processing intake rows untouched for this long are assumed lost and re-queued
+INTAKE_STALE_MINUTES = 10
+
+# Form keys mapped onto the Camp Settings fields of the same name
+# (first_day_of_camp is added by map_submission)
+CAMP_SETTINGS_FIELDS = (
+    "camp_name",
+    "timezone",
+    "num_campers",
+    "registration",
+    "how_campers_register",
+    "how_campers_enroll",
+    "features",
+    "pos_features",
+    "parent_visibility",
+    "parent_deposit",
+    "camp_deposit",
+    "camp_deposit_description",
+    "staff_discounts",
+    "cash_refunds",
+    "refund_threshold",
+    "donated_account_ballances",
+    "can_campers_use_cashcredit_cards",
+    "daily_spending_limit",
+    "camper_photos",
+    "care_packages",
+    "attendance_app",
+    "verify_adults",
+    "camper_checkin_upon_using_wristband",
+    "health_info_importation",
+    "parent_portal_visibility",
+    "special_requests",
+)
+
+# Form keys every submission must fill in
+CAMP_SETTINGS_REQUIRED = ("camp_name", "first_day_of_camp")
+
+# Outcome of bulk_insert_camp_settings: names written, names another request wrote first, {name: error}
+BulkInsertResult = namedtuple("BulkInsertResult", ["inserted", "existing", "errors"])
 
 
 @frappe.whitelist(allow_guest=True)
+@instrument
 def create_from_google_form():
     """
     Creates a new Camp Settings document from a Google Form submission.
@@ -16,92 +75,398 @@ def create_from_google_form():
     Args:
         None (uses frappe.local.form_dict for input)
     Returns:
-        dict: Status and name of the created document, or error message.
+        dict: Status and name of the created document (plus the form keys that match no Camp Settings field,
+            if any), or error message.
     """
     try:
         # Validate secret token for security
-        secret_token = frappe.local.form_dict.get("secret_token")
-        expected_token = frappe.db.get_single_value("Google Form Sync Settings", "secret_token")
-        if not secret_token or secret_token != expected_token:
-            frappe.throw("Invalid or missing secret token")
-
-        # Parse form data from request
-        data = frappe.local.form_dict
-        camp_name = data.get("camp_name")
-
-        # Prevent duplicate Camp Settings creation
-        if frappe.db.exists("Camp Settings", camp_name):
-            print(f"Camp Settings: {camp_name} already exists")
+        verify_secret_token(frappe.local.form_dict.get("secret_token"))
+
+        # Parse form data from request, create the Camp Settings and link its Camp
+        mapped = map_submission(frappe.local.form_dict)
+        name = insert_camp_settings(frappe.local.form_dict, mapped)
+        if not name:
             return
+        result = {"status": "success", "name": name}
+        if mapped.unknown:
+            result["unknown_fields"] = mapped.unknown
+        return result
+
+    except Exception as e:
+        # Log errors for debugging and support (the traceback goes to the Error Log only)
+        log.warning("Camp Settings insert failed: %s", e)
+        frappe.log_error(f"Error: {e!s}\n{frappe.get_traceback()}", "Google Form Sync Error")
+        return {"status": "error", "message": str(e)}
 
-        # Create new Camp Settings document and populate fields from form
-        doc = frappe.new_doc("Camp Settings")
-        date = convert_datetime(data.get("first_day_of_camp"))  # Parse and format date
-        doc.camp_name = data.get("camp_name")
-        doc.timezone = data.get("timezone")
-        doc.num_campers = data.get("num_campers")
-        doc.first_day_of_camp = date
-        doc.registration = data.get("registration")
-        doc.how_campers_register = data.get("how_campers_register")
-        doc.how_campers_enroll = data.get("how_campers_enroll")
-        doc.features = data.get("features")
-        doc.pos_features = data.get("pos_features")
-        doc.parent_visibility = data.get("parent_visibility")
-        doc.parent_deposit = data.get("parent_deposit")
-        doc.camp_deposit = data.get("camp_deposit")
-        doc.camp_deposit_description = data.get("camp_deposit_description")
-        doc.staff_discounts = data.get("staff_discounts")
-        doc.cash_refunds = data.get("cash_refunds")
-        doc.refund_threshold = data.get("refund_threshold")
-        doc.donated_account_ballances = data.get("donated_account_ballances")
-        doc.can_campers_use_cashcredit_cards = data.get("can_campers_use_cashcredit_cards")
-        doc.daily_spending_limit = data.get("daily_spending_limit")
-        doc.camper_photos = data.get("camper_photos")
-        doc.care_packages = data.get("care_packages")
-        doc.attendance_app = data.get("attendance_app")
-        doc.verify_adults = data.get("verify_adults")
-        doc.camper_checkin_upon_using_wristband = data.get("camper_checkin_upon_using_wristband")
-        doc.health_info_importation = data.get("health_info_importation")
-        doc.parent_portal_visibility = data.get("parent_portal_visibility")
-        doc.special_requests = data.get("special_requests")
-
-        # Insert the new document into the database
-        doc.insert(ignore_permissions=True)
-        frappe.db.commit()  # Commit transaction to ensure data is saved
-        print(f"✅ Inserted Camp Settings with name: {doc.name}")  # Log success
-
-        # Link Camp to Camp Settings if needed
-        link_camp_to_camp_settings(camp_name)
-
-        return {"status": "success", "name": doc.name}
 
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+@instrument
+def create_from_google_form_batch():
+    """
+    Creates Camp Settings documents for a batch of Google Form submissions in one request.
+    The secret token is checked once and every submission is mapped and validated before the database is
+    touched; then existing Camp Settings are found with one query, the new rows are validated like insert()
+    and bulk-inserted, all matching Camps are linked in one UPDATE and the batch is committed once.
+    A row that fails validation, or whose name a concurrent request took first, gets its own result.
+    Submissions are read from the "submissions" parameter (a list or a JSON array string) or, if it is
+    absent, from the raw request body as a JSON array or NDJSON (one JSON object per line). For NDJSON
+    bodies pass the token as the secret_token query parameter. With dry_run=1 the batch is only validated.
+    Args:
+        None (uses frappe.local.form_dict and the request body for input)
+    Returns:
+        dict: Overall status plus one result per submission, in input order:
+            {"index", "camp_name", "status": "success" | "exists" | "error" | "valid", "name" or "message"},
+            with "unknown_fields" listing the keys that match no Camp Settings field, if any.
+    """
+    try:
+        verify_secret_token(frappe.local.form_dict.get("secret_token"))
+        submissions = parse_submissions()
     except Exception as e:
-        # Log and print errors for debugging and support
-        print("❌ Error during Camp Settings insert:")
-        print(str(e))
-        print(frappe.get_traceback())
-        frappe.log_error(f"Error: {str(e)}\n{frappe.get_traceback()}", "Google Form Sync Error")
+        frappe.log_error(f"Error: {e!s}\n{frappe.get_traceback()}", "Google Form Batch Sync Error")
         return {"status": "error", "message": str(e)}
 
+    # Validate the whole batch first; mapping does not touch the database
+    results = []
+    valid = []  # (index, values) for the submissions that passed validation
+    for index, data in enumerate(submissions):
+        mapped = map_submission(data)
+        result = {"index": index, "camp_name": mapped.values["camp_name"] or data.get("camp_name")}
+        if mapped.unknown:
+            result["unknown_fields"] = mapped.unknown
+        if mapped.errors:
+            result.update(status="error", message="; ".join(mapped.errors))
+        else:
+            result["status"] = "valid"
+            valid.append((index, mapped.values))
+        results.append(result)
+    if frappe.utils.cint(frappe.local.form_dict.get("dry_run")):
+        return {"status": "success", "results": results}
+
+    names = [values["camp_name"] for _, values in valid]
+    # One query for every Camp Settings that already exists in this batch
+    existing = set(frappe.get_all("Camp Settings", filters={"name": ["in", names]}, pluck="name")) if names else set()
+
+    rows = []  # (index, values) for the submissions that will be inserted
+    seen = set()
+    for index, values in valid:
+        camp_name = values["camp_name"]
+        if camp_name in existing or camp_name in seen:
+            results[index].update(status="exists", name=camp_name)
+        else:
+            rows.append((index, values))
+            seen.add(camp_name)
+
+    if rows:
+        try:
+            inserted = bulk_insert_camp_settings([values for _, values in rows])
+            link_camps_to_camp_settings(inserted.inserted)
+            frappe.db.commit()  # One commit for the whole batch
+            for index, values in rows:
+                camp_name = values["camp_name"]
+                if camp_name in inserted.errors:
+                    results[index].update(status="error", message=inserted.errors[camp_name])
+                elif camp_name in inserted.existing:
+                    results[index].update(status="exists", name=camp_name)
+                else:
+                    results[index].update(status="success", name=camp_name)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Error: {e!s}\n{frappe.get_traceback()}", "Google Form Batch Sync Error")
+            for index, _ in rows:
+                results[index].update(status="error", message=str(e))
+
+    return {"status": "success", "results": results}
 
-def convert_datetime(date):
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+@instrument
+def enqueue_from_google_form():
     """
-    Converts a date string from Google Form format to YYYY-MM-DD for ERPNext.
-    Throws an error if the date is missing or cannot be parsed.
+    Asynchronous variant of create_from_google_form for Apps Script webhooks.
+    The request is authenticated, the raw submission is stored in a Google Form Intake row and committed,
+    and the endpoint answers 202 straight away. The Camp Settings insert and Camp linking run in a
+    background job (process_intake); failures are retried by retry_failed_intakes and moved to
+    "Dead Letter" after MAX_INTAKE_ATTEMPTS.
     Args:
-        date (str): Date string from form
+        None (uses frappe.local.form_dict for input)
     Returns:
-        str: Formatted date string
+        dict: {"status": "queued", "intake": <intake name>} or an error message.
     """
-    if not date:
-        frappe.throw("Missing 'first_day_of_camp'")
     try:
-        # Parse date from Google Form format
-        parsed_date = datetime.strptime(date, "%a %b %d %H:%M:%S GMT%z %Y")
-        return parsed_date.strftime("%Y-%m-%d")  # Return in ERPNext format
+        verify_secret_token(frappe.local.form_dict.get("secret_token"))
+    except Exception as e:
+        frappe.local.response.http_status_code = 403
+        return {"status": "error", "message": str(e)}
+
+    try:
+        # Keep the submission exactly as received, minus the token and the request routing key
+        data = {key: value for key, value in frappe.local.form_dict.items() if key not in ("secret_token", "cmd")}
+        intake = frappe.get_doc({
+            "doctype": "Google Form Intake",
+            "camp_name": data.get("camp_name"),
+            "status": "Queued",
+            "payload": json.dumps(data, default=str),
+        })
+        intake.insert(ignore_permissions=True)
+        frappe.db.commit()  # The submission must be durable before we acknowledge it
+        enqueue_intake(intake.name)
     except Exception as e:
-        print(f"Date Parse Error: {str(e)}")  # Log parse error
-        frappe.throw(f"Invalid date format for first_day_of_camp: {date}")
+        frappe.log_error(f"Error: {e!s}\n{frappe.get_traceback()}", "Google Form Intake Error")
+        return {"status": "error", "message": str(e)}
+
+    frappe.local.response.http_status_code = 202
+    return {"status": "queued", "intake": intake.name}
+
+
+def enqueue_intake(intake):
+    """
+    Queues a background job that processes one Google Form Intake row.
+    The job id is derived from the intake name so the same row is never queued twice.
+    Args:
+        intake (str): Name of the Google Form Intake document.
+    """
+    frappe.enqueue(
+        process_intake,
+        queue="short",
+        timeout=300,
+        job_id=f"camp_manager::google_form_intake::{intake}",
+        deduplicate=True,
+        intake=intake,
+    )
+
+
+def process_intake(intake):
+    """
+    Background job: creates the Camp Settings for a stored Google Form submission.
+    The attempt is recorded and committed before the work starts, so a crashed worker still counts
+    towards MAX_INTAKE_ATTEMPTS. On failure the row is marked "Failed" (to be retried) or,
+    once the attempts are used up, "Dead Letter" and an Error Log entry is written.
+    Args:
+        intake (str): Name of the Google Form Intake document.
+    """
+    doc = frappe.get_doc("Google Form Intake", intake)
+    if doc.status in ("Processed", "Dead Letter"):
+        return  # already handled by an earlier run
+
+    attempts = (doc.attempts or 0) + 1
+    doc.db_set({"status": "Processing", "attempts": attempts}, commit=True)
+    try:
+        name = insert_camp_settings(json.loads(doc.payload or "{}"))
+        doc.db_set({
+            "status": "Processed",
+            "camp_settings": name or doc.camp_name,
+            "processed_on": frappe.utils.now(),
+            "last_error": None,
+        })
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        traceback = frappe.get_traceback()
+        status = "Dead Letter" if attempts >= MAX_INTAKE_ATTEMPTS else "Failed"
+        doc.db_set({"status": status, "last_error": traceback}, commit=True)
+        if status == "Dead Letter":
+            frappe.log_error(f"Google Form Intake {intake} gave up after {attempts} attempts\n{traceback}",
+                             "Google Form Intake Dead Letter")
+
+
+def retry_failed_intakes():
+    """
+    Scheduled job: re-queues intake rows that still need processing.
+    Picks up "Failed" rows, "Queued" rows whose job was lost, and "Processing" rows whose worker died
+    (not touched for INTAKE_STALE_MINUTES). Running every few minutes gives failed rows a natural backoff.
+    """
+    stale = frappe.utils.add_to_date(frappe.utils.now_datetime(), minutes=-INTAKE_STALE_MINUTES)
+    intakes = frappe.get_all(
+        "Google Form Intake",
+        or_filters=[
+            ["status", "=", "Failed"],
+            ["status", "in", ["Queued", "Processing"]],
+        ],
+        filters={"modified": ["<", stale], "attempts": ["<", MAX_INTAKE_ATTEMPTS]},
+        pluck="name",
+        limit=500,
+    )
+    for intake in intakes:
+        enqueue_intake(intake)
+
+
+def insert_camp_settings(data, mapped=None):
+    """
+    Creates the Camp Settings for one submission and links the matching Camp.
+    Shared by the synchronous endpoint and the intake worker. The submission is validated before any query.
+    Args:
+        data (dict): Form values from one submission.
+        mapped (MappedPayload): The submission already mapped by map_submission, if the caller has it.
+    Returns:
+        str: Name of the new Camp Settings, or None if it already existed.
+    Raises:
+        frappe.ValidationError: If a required value is missing or a value cannot be converted.
+    """
+    mapped = mapped or map_submission(data)
+    if mapped.errors:
+        frappe.throw("; ".join(mapped.errors))
+    if mapped.unknown:
+        log.info("Ignored unknown form fields: %s", ", ".join(mapped.unknown), sample=True)
+    camp_name = mapped.values["camp_name"]
+
+    # Prevent duplicate Camp Settings creation
+    if frappe.db.exists("Camp Settings", camp_name):
+        log.info("Camp Settings %s already exists", camp_name, sample=True)
+        return None
+
+    # Create new Camp Settings document and populate fields from form
+    doc = frappe.new_doc("Camp Settings")
+    doc.update(mapped.values)
+
+    # Insert the new document into the database
+    doc.insert(ignore_permissions=True)
+    frappe.db.commit()  # Commit transaction to ensure data is saved
+    log.info("Inserted Camp Settings %s", doc.name)  # Log success
+
+    # Link Camp to Camp Settings if needed
+    link_camp_to_camp_settings(camp_name)
+    return doc.name
+
+
+def verify_secret_token(secret_token):
+    """
+    Checks the secret token sent by the Google Form against Google Form Sync Settings.
+    The active token hashes are cached (see api.tokens), so rejected probes never reach the database.
+    Args:
+        secret_token (str): Token sent with the request.
+    Raises:
+        frappe.ValidationError: If the token is missing or does not match.
+    """
+    if not is_valid_token(secret_token):
+        frappe.throw("Invalid or missing secret token")
+
+
+def parse_submissions():
+    """
+    Reads the list of submissions for the batch endpoint.
+    Returns:
+        list[dict]: One dict of form values per submission.
+    Raises:
+        frappe.ValidationError: If the payload is not a list of JSON objects.
+    """
+    raw = frappe.local.form_dict.get("submissions")
+    if raw is None and frappe.request:
+        raw = frappe.request.get_data(as_text=True)
+    if isinstance(raw, str):
+        text = raw.strip()
+        if not text:
+            raw = []
+        elif text.startswith("["):
+            raw = json.loads(text)  # JSON array
+        else:
+            raw = [json.loads(line) for line in text.splitlines() if line.strip()]  # NDJSON
+    if not isinstance(raw, (list, tuple)) or not all(isinstance(data, dict) for data in raw):
+        frappe.throw("Submissions must be a list of JSON objects")
+    return list(raw)
+
+
+def map_submission(data):
+    """
+    Maps a Google Form submission onto Camp Settings field values with the compiled mapper.
+    Args:
+        data (dict): Form values from one submission.
+    Returns:
+        MappedPayload: (values, errors, unknown) - see api.payload_mapper.
+    """
+    fields = (*CAMP_SETTINGS_FIELDS, "first_day_of_camp")
+    return get_mapper("Camp Settings", fields, CAMP_SETTINGS_REQUIRED).map(data)
+
+
+def bulk_insert_camp_settings(rows):
+    """
+    Inserts many Camp Settings rows with a single multi-row INSERT.
+    Each row is first built as a document and put through the checks insert() runs before writing (defaults,
+    naming, links, the before_insert / validate / before_save methods and their doc_events, mandatory and
+    field validation), so only rows insert() would accept are written. The INSERT skips names that are
+    already taken, e.g. by a concurrent submission, instead of failing the batch. The after-write events
+    (after_insert, on_update) do not run; the app's only one, the identity cache, is cleared here.
+    Args:
+        rows (list[dict]): Field values per document, as returned by map_submission.
+    Returns:
+        BulkInsertResult: The camp names written, those that already existed and {camp name: error}.
+    """
+    now = frappe.utils.now()
+    docs, errors = {}, {}
+    for row in rows:
+        doc = frappe.new_doc("Camp Settings")
+        doc.update(row)
+        try:
+            _prepare_insert(doc, now)
+        except frappe.ValidationError as e:
+            frappe.clear_last_message()  # Reported in the row's result instead
+            errors[row["camp_name"]] = str(e)
+            continue
+        docs[row["camp_name"]] = doc.get_valid_dict(convert_dates_to_str=True)
+    if not docs:
+        return BulkInsertResult([], [], errors)
+
+    columns = list(next(iter(docs.values())))
+    frappe.db.bulk_insert(
+        "Camp Settings", columns, [list(values.values()) for values in docs.values()], ignore_duplicates=True
+    )
+    # Rows carrying this insert's timestamp are ours; a name without one was taken by another request first
+    names = [values["name"] for values in docs.values()]
+    written = set(
+        frappe.get_all("Camp Settings", filters={"name": ["in", names], "creation": now}, pluck="name")
+    )
+    inserted = [camp_name for camp_name, values in docs.items() if values["name"] in written]
+    existing = [camp_name for camp_name, values in docs.items() if values["name"] not in written]
+    # A Camp resolves to the Camp Settings of its own name, so the new rows change the cached identities
+    clear_after_commit(inserted)
+    return BulkInsertResult(inserted, existing, errors)
+
+
+def _prepare_insert(doc, now):
+    # The steps of Document.insert up to the database write
+    doc.flags.ignore_permissions = True
+    doc._set_defaults()
+    doc.owner = doc.modified_by = frappe.session.user
+    doc.creation = doc.modified = now
+    doc.docstatus = 0
+    doc.check_if_latest()  # No query for a new document; marks the action as a save
+    doc._validate_links()
+    doc.run_method("before_insert")
+    doc.set_new_name()
+    doc.flags.in_insert = True
+    doc.run_before_save_methods()
+    doc._validate()
+    doc.flags.in_insert = False
+
+
+def link_camps_to_camp_settings(camp_names):
+    """
+    Links every existing, still unlinked Camp in camp_names to the Camp Settings of the same name,
+    using a single UPDATE instead of loading and saving each Camp.
+    The only Camp save hook that reacts to the link is update_link_status, so settings_status is set here too.
+    Args:
+        camp_names (list[str]): Names of the camps (identical to their Camp Settings names)
+    """
+    if not camp_names:
+        return
+    camp = frappe.qb.DocType("Camp")
+    unlinked = (
+        frappe.qb.from_(camp)
+        .select(camp.name)
+        .where(camp.name.isin(camp_names))
+        .where(camp.link_to_camp_settings.isnull() | (camp.link_to_camp_settings == ""))
+    ).run(pluck=True)
+    if not unlinked:
+        return
+    (
+        frappe.qb.update(camp)
+        .set(camp.link_to_camp_settings, camp.name)
+        .set(camp.settings_status, "Linked")
+        .set(camp.modified, frappe.utils.now())
+        .where(camp.name.isin(unlinked))
+    ).run()
+    # The UPDATE skips the Camp hooks, so publish the change to the change log and drop the identities here
+    record_updates("Camp", unlinked, ["link_to_camp_settings", "settings_status"])
+    clear_after_commit(unlinked)
 
 
 def link_camp_to_camp_settings(camp_name):
@@ -116,12 +481,12 @@ def link_camp_to_camp_settings(camp_name):
         if frappe.db.exists("Camp", camp_name):
             camp = frappe.get_doc("Camp", camp_name)
             # Only link if not already linked
-            if not camp.get("link_camp_to_camp_settings"):
+            if not camp.link_to_camp_settings:
                 camp.link_to_camp_settings = camp_name
                 camp.save(ignore_permissions=True)
         else:
-            print(f"No Camp found with name: {camp_name}")  # Log missing camp
+            log.info("No Camp found with name %s", camp_name, sample=True)  # Log missing camp
     except Exception as e:
-        # Log and print errors for debugging
-        print(f"Link Error: {str(e)}\n{frappe.get_traceback()}")
-        frappe.log_error(f"Link Error: {str(e)}\n{frappe.get_traceback()}", "Link Camp Error")
\ No newline at end of file
+        # Log errors for debugging (the traceback goes to the Error Log only)
+        log.warning("Link error for Camp %s: %s", camp_name, e)
+        frappe.log_error(f"Link Error: {e!s}\n{frappe.get_traceback()}", "Link Camp Error")
\ No newline at end of file
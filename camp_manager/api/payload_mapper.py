@@ -0,0 +1,204 @@
+# math rejects infinite and NaN numbers
+import math
+
+# re normalizes numbers and gives each date string a "shape" for the format cache
+import re
+
+# namedtuple holds the result of mapping one submission
+from collections import namedtuple
+
+# Datetime parses the submitted dates
+from datetime import datetime
+
+# Frappe is used to read the doctype meta the mapper is compiled from
+import frappe
+
+# Result of mapping one submission: field values, error messages and the keys no field accepts
+MappedPayload = namedtuple("MappedPayload", ["values", "errors", "unknown"])
+
+# Date formats accepted for Date fields, most common first (Google Forms sends the first one)
+DATE_FORMATS = (
+    "%a %b %d %H:%M:%S GMT%z %Y",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y",
+    "%m/%d/%y",
+    "%B %d, %Y",
+    "%b %d, %Y",
+)
+
+# Spellings accepted for Check fields
+TRUE_VALUES = frozenset({"1", "true", "yes", "y", "on", "checked"})
+FALSE_VALUES = frozenset({"0", "false", "no", "n", "off", "unchecked", ""})
+
+# Request keys that are not form fields and are never reported as unknown
+IGNORED_KEYS = frozenset({"secret_token", "cmd", "submissions", "dry_run"})
+
+# Default length of a Data column when the field does not set one
+DEFAULT_DATA_LENGTH = 140
+
+# {date shape: format} of the format that last parsed a date of that shape (e.g. "aaa aaa 99 ...")
+_format_cache = {}
+
+# {(site, doctype, fields, required): PayloadMapper}
+_mappers = {}
+
+
+class PayloadMapper:
+    """
+    Maps submitted key/value pairs onto the fields of a doctype.
+    The converter of each field (Int, Float, Check, Date, Select, Data and text fields) is chosen once,
+    from the doctype meta, when the mapper is built; mapping a submission then only runs those converters.
+    Mapping never touches the database, so a whole batch can be validated before anything is written:
+
+        mapped = get_mapper("Camp Settings", CAMP_SETTINGS_FIELDS).map(data)
+        if mapped.errors:
+            ...
+    """
+
+    def __init__(self, doctype, fields, required=()):
+        meta = frappe.get_meta(doctype)
+        self.doctype = doctype
+        self.modified = meta.modified
+        self.required = tuple(required)
+        self.converters = {}
+        for fieldname in fields:
+            df = meta.get_field(fieldname)
+            if not df:
+                frappe.throw(f"{doctype} has no field {fieldname}")
+            self.converters[fieldname] = _compile(df)
+
+    def map(self, data):
+        """
+        Converts one submission.
+        Args:
+            data (dict): Submitted values, keyed by fieldname.
+        Returns:
+            MappedPayload: values for every mapped field (None when missing or invalid), one message per
+            missing required or invalid value, and the submitted keys that are not mapped fields.
+        """
+        values, errors = {}, []
+        for fieldname, convert in self.converters.items():
+            raw = data.get(fieldname)
+            if isinstance(raw, str):
+                raw = raw.strip()
+            if raw in (None, ""):
+                values[fieldname] = None
+                if fieldname in self.required:
+                    errors.append(f"Missing '{fieldname}'")
+                continue
+            try:
+                values[fieldname] = convert(raw)
+            except (ValueError, OverflowError) as e:
+                values[fieldname] = None
+                errors.append(f"Invalid value for {fieldname}: {e}")
+        unknown = sorted(key for key in data if key not in self.converters and key not in IGNORED_KEYS)
+        return MappedPayload(values, errors, unknown)
+
+
+def get_mapper(doctype, fields, required=()):
+    """
+    Returns the compiled mapper for a doctype and field list, building it on first use and again whenever
+    the doctype meta changes.
+    Args:
+        doctype (str): Target doctype.
+        fields (tuple): Fieldnames the submissions may set.
+        required (tuple): Fieldnames that must have a value.
+    Returns:
+        PayloadMapper
+    """
+    key = (frappe.local.site, doctype, tuple(fields), tuple(required))
+    mapper = _mappers.get(key)
+    if mapper is None or mapper.modified != frappe.get_meta(doctype).modified:
+        mapper = _mappers[key] = PayloadMapper(doctype, fields, required)
+    return mapper
+
+
+def parse_date(value):
+    """
+    Parses a submitted date with DATE_FORMATS. The format that last matched a date of the same shape is
+    tried first, so a steady stream of one format costs a single strptime per value.
+    Args:
+        value (str): Submitted date.
+    Returns:
+        str: The date as YYYY-MM-DD (in the submitted time zone, if it has one).
+    Raises:
+        ValueError: If no format matches.
+    """
+    shape = re.sub(r"[A-Za-z]+", "a", re.sub(r"\d", "9", value))
+    cached = _format_cache.get(shape)
+    for date_format in ((cached,) if cached else ()) + DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        _format_cache[shape] = date_format
+        return parsed.strftime("%Y-%m-%d")
+    raise ValueError(f"unrecognized date {value!r}")
+
+
+def _compile(df):
+    # Picks the converter of one field; options and lengths are resolved here, not per value
+    if df.fieldtype == "Int":
+        return _to_int
+    if df.fieldtype in ("Float", "Currency", "Percent"):
+        return _to_float
+    if df.fieldtype == "Check":
+        return _to_check
+    if df.fieldtype == "Date":
+        return parse_date
+    if df.fieldtype == "Select":
+        options = [option for option in (df.options or "").split("\n") if option]
+        by_lower = {option.lower(): option for option in options}
+
+        def to_select(value):
+            value = str(value)
+            if value in options:
+                return value
+            if value.lower() in by_lower:
+                return by_lower[value.lower()]
+            raise ValueError(f"{value!r} is not one of {', '.join(options)}")
+
+        return to_select
+    if df.fieldtype in ("Data", "Link"):
+        max_length = df.length or DEFAULT_DATA_LENGTH
+
+        def to_data(value):
+            value = str(value)
+            if len(value) > max_length:
+                raise ValueError(f"longer than {max_length} characters")
+            return value
+
+        return to_data
+    return str
+
+
+def _to_int(value):
+    number = _to_float(value)  # Finite, so int() cannot overflow
+    if number != int(number):
+        raise ValueError(f"{value!r} is not a whole number")
+    return int(number)
+
+
+def _to_float(value):
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            number = float(value)
+        else:
+            number = float(re.sub(r"[,\s]", "", str(value)))
+    except (ValueError, OverflowError):
+        raise ValueError(f"{value!r} is not a number") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not a number")  # "inf", "nan", ...
+    return number
+
+
+def _to_check(value):
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return 1
+    if text in FALSE_VALUES:
+        return 0
+    raise ValueError(f"{value!r} is not a yes/no value")
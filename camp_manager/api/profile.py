@@ -0,0 +1,223 @@
+# hashlib builds the ETag from the version stamps of the requested records
+import hashlib
+
+# JSON is used to parse the request arguments and to serialize the version stamps for the ETag
+import json
+
+# Frappe is used for the permission checks, the projected queries and the HTTP response
+import frappe
+
+# Field-level permissions (permlevel) of the requesting user
+from frappe.model import get_permitted_fields
+
+# Latest change log entry of the requested organizations and Onboardings, for the ETag
+from frappe.query_builder.functions import Max
+
+# The endpoint builds its own response so it can carry the ETag header and answer 304
+from werkzeug.wrappers import Response
+
+# Direct UPDATEs do not touch modified, but every one of them is published to the change log
+from camp_manager.change_log import CHANGE_LOG_DOCTYPE
+
+# One joined query resolves the Customer, Onboarding and Camp Settings of every organization
+from camp_manager.identity import ORGANIZATION_DOCTYPES, resolve_many
+
+# Profile sections and the doctype each one is read from ("organization" is the requested doctype)
+SECTIONS = {
+    "organization": None,
+    "camp_settings": "Camp Settings",
+    "customer": "Customer",
+    "onboarding": "Onboarding",
+}
+
+# Columns returned for a section the caller did not project
+DEFAULT_FIELDS = {
+    "organization": ["organization_name", "email", "phone", "timezone"],
+    "camp_settings": ["camp_name", "camp_type", "num_campers", "first_day_of_camp"],
+    "customer": ["customer_name", "default_currency"],
+    "onboarding": ["organization_type", "organization_funfangle_id", "organization_order_id"],
+}
+
+# Never returned, even when requested
+EXCLUDED_FIELDTYPES = ("Password",)
+
+# Organizations per request
+MAX_NAMES = 500
+
+
+@frappe.whitelist()
+def get_organization_profiles(names, doctype="Camp", fields=None):
+    """
+    Returns the combined profile (organization, Camp Settings, Customer, Onboarding) of one or many
+    organizations, with one query per section whatever the number of organizations.
+    The response carries an ETag header (also returned as "etag"); a request whose If-None-Match header
+    matches it gets an empty 304 response. The ETag is built from one count / max(modified) query per
+    section and the latest change log entry, so a 304 is answered without reading the sections.
+    Frappe passes a returned werkzeug Response through unchanged, which is the only way a whitelisted method
+    can set its own headers and status.
+    Args:
+        names (str | list): Organization name, comma-separated names or JSON list of names.
+        doctype (str): "Camp" or "Other Organization".
+        fields (str | dict): JSON object {section: [fieldnames]} selecting the columns of each section
+            (organization, camp_settings, customer, onboarding). Omitted sections use DEFAULT_FIELDS;
+            an empty list leaves the section out.
+    Returns:
+        Response: 200 with the JSON body {"message": {"profiles": {name: {section: {name, modified, ...fields}
+            or None}}, "missing": [names], "etag": str}}, or an empty 304.
+    """
+    names = _parse_names(names)
+    projection = _projection(doctype, fields)
+    identities = resolve_many(doctype, names)
+    missing = sorted(set(names) - set(identities))
+    section_names = {section: _section_names(section, identities) for section in projection}
+
+    etag = _etag(doctype, projection, identities, missing, section_names)
+    if _matches(frappe.get_request_header("If-None-Match"), etag):
+        response = Response(status=304)
+    else:
+        sections = {
+            section: _fetch(_section_doctype(section, doctype), section_names[section], section_fields)
+            for section, section_fields in projection.items()
+        }
+        profiles = {}
+        for name, identity in identities.items():
+            profiles[name] = {
+                section: rows.get(name if section == "organization" else identity[section])
+                for section, rows in sections.items()
+            }
+        result = {"profiles": profiles, "missing": missing, "etag": etag}
+        response = Response(frappe.as_json({"message": result}), mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"  # Clients must revalidate before reusing
+    return response
+
+
+def _parse_names(names):
+    if isinstance(names, str):
+        text = names.strip()
+        names = json.loads(text) if text.startswith("[") else text.split(",")
+    names = [str(name).strip() for name in names or [] if str(name).strip()]
+    if not names:
+        frappe.throw("At least one organization name is required")
+    if len(names) > MAX_NAMES:
+        frappe.throw(f"At most {MAX_NAMES} organizations can be requested at once")
+    return list(dict.fromkeys(names))
+
+
+def _projection(doctype, fields):
+    """
+    Validates the requested columns of each section against the doctype and the user's permissions.
+    Returns:
+        dict: {section: [fieldnames]} for the sections to include.
+    """
+    if doctype not in ORGANIZATION_DOCTYPES:
+        frappe.throw(f"Unknown organization type {doctype}")
+    if isinstance(fields, str):
+        fields = json.loads(fields) if fields.strip() else None
+    fields = fields or {}
+    unknown_sections = set(fields) - set(SECTIONS)
+    if unknown_sections:
+        frappe.throw(f"Unknown profile sections: {', '.join(sorted(unknown_sections))}")
+
+    projection = {}
+    for section in SECTIONS:
+        requested = fields.get(section, DEFAULT_FIELDS[section])
+        if not requested:
+            continue
+        if section == "camp_settings" and doctype != "Camp":
+            continue  # Only Camps have Camp Settings
+        section_doctype = _section_doctype(section, doctype)
+        frappe.has_permission(section_doctype, "read", throw=True)
+        allowed = _readable_fields(section_doctype)
+        invalid = [fieldname for fieldname in requested if fieldname not in allowed]
+        if invalid:
+            frappe.throw(f"Cannot read {', '.join(invalid)} of {section_doctype}")
+        projection[section] = list(dict.fromkeys(requested))
+    return projection
+
+
+def _readable_fields(doctype):
+    # Columns the user may read, without passwords and child tables
+    meta = frappe.get_meta(doctype)
+    columns = set(meta.get_valid_columns())
+    return {
+        fieldname
+        for fieldname in get_permitted_fields(doctype)
+        if fieldname in columns
+        and not (meta.get_field(fieldname) and meta.get_field(fieldname).fieldtype in EXCLUDED_FIELDTYPES)
+    }
+
+
+def _section_doctype(section, doctype):
+    return SECTIONS[section] or doctype
+
+
+def _section_names(section, identities):
+    if section == "organization":
+        return list(identities)
+    return [identity[section] for identity in identities.values() if identity[section]]
+
+
+def _fetch(doctype, names, fields):
+    # One query for the whole section; get_list applies the user's row-level permissions
+    if not names:
+        return {}
+    rows = frappe.get_list(
+        doctype,
+        filters={"name": ["in", names]},
+        fields=["name", "modified"] + [f for f in fields if f not in ("name", "modified")],
+        limit_page_length=0,
+    )
+    return {row.name: row for row in rows}
+
+
+def _etag(doctype, projection, identities, missing, section_names):
+    """
+    Returns the version of a response without building it. It changes when a requested record is saved
+    (max modified), deleted or hidden from the user (row count), updated directly (change log), or linked to
+    other records (identities), and differs per user and projection.
+    """
+    state = {
+        "user": frappe.session.user,
+        "doctype": doctype,
+        "projection": projection,
+        "identities": identities,
+        "missing": missing,
+        "sections": {
+            section: _version(_section_doctype(section, doctype), names)
+            for section, names in section_names.items()
+        },
+        "change_log": _last_change(section_names),
+    }
+    payload = json.dumps(state, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _version(doctype, names):
+    # Row count and latest modified of a section, under the same row-level permissions as _fetch
+    if not names:
+        return None
+    row = frappe.get_list(
+        doctype,
+        filters={"name": ["in", names]},
+        fields=["count(name) as row_count", "max(modified) as last_modified"],
+        limit_page_length=0,
+    )[0]
+    return [row.row_count, row.last_modified]
+
+
+def _last_change(section_names):
+    # Organizations and Onboardings are the tracked doctypes among the sections
+    names = section_names.get("organization", []) + section_names.get("onboarding", [])
+    if not names:
+        return None
+    log = frappe.qb.DocType(CHANGE_LOG_DOCTYPE)
+    return frappe.qb.from_(log).select(Max(log.name)).where(log.ref_name.isin(names)).run()[0][0]
+
+
+def _matches(if_none_match, etag):
+    # If-None-Match can list several (possibly weak) ETags, or be "*"
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/").strip('"') == etag for tag in candidates)
@@ -0,0 +1,88 @@
+# hashlib/hmac give us token hashing and constant-time comparison
+import hashlib
+import hmac
+
+# Time is used to expire the in-process copy of the token hashes
+import time
+
+# Frappe is used for the Redis cache and to read Google Form Sync Settings on a cache miss
+import frappe
+
+# Redis key holding the SHA-256 hashes of every active token (frappe.cache prefixes it per site)
+TOKEN_CACHE_KEY = "camp_manager:google_form_token_hashes"
+
+# Upper bound on the life of the Redis copy, in case a clear is ever missed
+REDIS_CACHE_SECONDS = 300
+
+# How long a worker trusts its in-process copy before asking Redis again.
+# Once a Google Form Sync Settings save commits, Redis and the saving worker's copy are cleared; other workers
+# pick up the change within this window, which is why the old token should stay in "Previous Secret Tokens"
+# while rotating.
+LOCAL_CACHE_SECONDS = 30
+
+# Longer tokens are rejected without any lookup
+MAX_TOKEN_LENGTH = 512
+
+# {site: (expires_at, token hashes)}
+_local_cache = {}
+
+
+def is_valid_token(secret_token):
+    """
+    Checks a webhook token against the active Google Form Sync Settings tokens.
+    Only SHA-256 hashes of the tokens are cached (in process and in Redis), and the candidate is compared
+    against every active hash with hmac.compare_digest, so the check takes the same time whichever token
+    matches. Malformed tokens are rejected before any cache or database access.
+    Args:
+        secret_token: Token sent with the request.
+    Returns:
+        bool: True if the token matches the current or a previous (rotation) token.
+    """
+    if not secret_token or not isinstance(secret_token, str) or len(secret_token) > MAX_TOKEN_LENGTH:
+        return False
+
+    candidate = _hash_token(secret_token)
+    matched = False
+    for token_hash in get_token_hashes():
+        # No early exit: every active hash is compared
+        matched |= hmac.compare_digest(candidate, token_hash)
+    return matched
+
+
+def get_token_hashes():
+    """
+    Returns the hashes of all active tokens, from the in-process cache, then Redis, then the database.
+    Returns:
+        tuple[str]: Hex SHA-256 digests of the active tokens.
+    """
+    site = frappe.local.site
+    cached = _local_cache.get(site)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+
+    hashes = frappe.cache.get_value(TOKEN_CACHE_KEY)
+    if hashes is None:
+        hashes = _load_token_hashes()
+        frappe.cache.set_value(TOKEN_CACHE_KEY, hashes, expires_in_sec=REDIS_CACHE_SECONDS)
+    hashes = tuple(hashes)
+    _local_cache[site] = (now + LOCAL_CACHE_SECONDS, hashes)
+    return hashes
+
+
+def clear_token_cache():
+    """Drops the cached token hashes (called after a Google Form Sync Settings save commits)."""
+    frappe.cache.delete_value(TOKEN_CACHE_KEY)
+    _local_cache.pop(frappe.local.site, None)
+
+
+def _load_token_hashes():
+    # One query reads every field of the single doctype
+    settings = frappe.db.get_singles_dict("Google Form Sync Settings")
+    tokens = [settings.get("secret_token") or ""]
+    tokens += (settings.get("previous_secret_tokens") or "").splitlines()
+    return [_hash_token(token.strip()) for token in tokens if token and token.strip()]
+
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
@@ -0,0 +1,241 @@
+# JSON is used for the machine-readable report
+import json
+
+# Time is used to measure each operation
+import time
+
+# Frappe is used to seed, save and clean up the benchmark records
+import frappe
+
+# App version recorded in the report, so runs can be compared across releases
+from camp_manager import __version__
+
+# Entry points under test
+from camp_manager.api.create_entry import create_from_google_form
+from camp_manager.api.tokens import clear_token_cache
+
+# Query counter shared with the hook instrumentation
+from camp_manager.instrumentation import count_queries
+from camp_manager.lead_hooks import LEAD_FIELDS, convert_lead, convert_leads
+from camp_manager.onboarding_pipeline import refresh_phase_summary
+
+# Every record created by a run is named "<BENCH_PREFIX>-<run id>-...", so cleanup can find it
+BENCH_PREFIX = "BENCH"
+
+# Google Form date format expected by create_from_google_form
+FORM_DATE = "Mon Jun 02 00:00:00 GMT-0400 2025"
+
+
+def run(n=50, output=None, keep=0):
+    """
+    Runs the save pipeline and webhook benchmarks against the current site and returns a JSON-ready report.
+    Meant for a local test site, e.g.:
+        bench --site test_site execute camp_manager.benchmarks.run --kwargs "{'n': 200, 'output': '/tmp/bench.json'}"
+    N Camps and N Other Organizations are inserted (which creates their Customers and Onboardings), then each
+    operation runs N times. Every sample records wall time and query count; the transaction is committed after
+    each sample, outside the measured time.
+    Args:
+        n (int): Number of records seeded and operations measured per benchmark.
+        output (str): Optional path the JSON report is written to.
+        keep (int): If 1, the seeded records are left in place for inspection.
+    Returns:
+        dict: {"version", "site", "n", "run_id", "started_at", "operations": {name: stats}}
+    """
+    n = frappe.utils.cint(n)
+    run_id = frappe.generate_hash(length=6)
+    prefix = f"{BENCH_PREFIX}-{run_id}"
+    report = {
+        "version": __version__,
+        "site": frappe.local.site,
+        "n": n,
+        "run_id": run_id,
+        "started_at": str(frappe.utils.now_datetime()),
+        "operations": {},
+    }
+    operations = report["operations"]
+    try:
+        camps = [f"{prefix}-camp-{i}" for i in range(n)]
+        others = [f"{prefix}-org-{i}" for i in range(n)]
+        operations["camp_insert"] = measure(camps, lambda name: _insert_organization("Camp", name))
+        operations["other_organization_insert"] = measure(
+            others, lambda name: _insert_organization("Other Organization", name)
+        )
+        operations["camp_save"] = measure(camps, _save_camp)
+        operations["onboarding_save"] = measure(camps, _save_onboarding)
+
+        leads = _seed_leads(prefix, 2 * n)
+        operations["lead_conversion"] = measure(leads[:n], convert_lead)
+        bulk_rows = frappe.get_all("Lead", filters={"name": ["in", leads[n:]]}, fields=LEAD_FIELDS)
+        operations["lead_conversion_bulk"] = measure(
+            [bulk_rows], lambda rows: convert_leads(rows), batch_size=len(bulk_rows)
+        )
+
+        operations["create_from_google_form"] = _benchmark_webhook(camps)
+    finally:
+        frappe.db.rollback()
+        if not frappe.utils.cint(keep):
+            cleanup(prefix)
+
+    if output:
+        with open(output, "w") as fh:
+            json.dump(report, fh, indent=1, default=str)
+    return report
+
+
+def measure(items, fn, batch_size=1):
+    """
+    Calls fn once per item and summarizes the samples.
+    Args:
+        items (list): Arguments, one per call.
+        fn: The operation to measure.
+        batch_size (int): Records handled per call, used for the throughput figure.
+    Returns:
+        dict: count, errors, throughput_per_s, p50_ms, p99_ms, max_ms, mean_queries, max_queries.
+    """
+    durations, queries, errors = [], [], 0
+    for item in items:
+        with count_queries() as counted:
+            start = time.perf_counter()
+            try:
+                fn(item)
+            except Exception:
+                errors += 1
+                frappe.db.rollback()
+                frappe.log_error(frappe.get_traceback(), "Camp Manager Benchmark Error")
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+        frappe.db.commit()
+        durations.append(elapsed)
+        queries.append(counted["queries"])
+    return summarize(durations, queries, errors, batch_size)
+
+
+def summarize(durations, queries, errors=0, batch_size=1):
+    """
+    Builds the statistics for one operation.
+    Args:
+        durations (list[float]): Wall time of each sample, in seconds.
+        queries (list[int]): Query count of each sample.
+        errors (int): Number of failed samples (not included in the timings).
+        batch_size (int): Records handled per sample.
+    """
+    if not durations:
+        return {"count": 0, "errors": errors}
+    total = sum(durations)
+    return {
+        "count": len(durations),
+        "errors": errors,
+        "throughput_per_s": round(len(durations) * batch_size / total, 2) if total else None,
+        "p50_ms": round(percentile(durations, 50) * 1000, 2),
+        "p99_ms": round(percentile(durations, 99) * 1000, 2),
+        "max_ms": round(max(durations) * 1000, 2),
+        "mean_queries": round(sum(queries) / len(queries), 2),
+        "max_queries": max(queries),
+    }
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil(len * pct / 100)
+    return ordered[int(rank) - 1]
+
+
+def cleanup(prefix):
+    """
+    Deletes every record created by a benchmark run, including the change log entries, blocking keys,
+    comments and Google Form intakes it produced, then recounts the onboarding pipeline summary.
+    Args:
+        prefix (str): "<BENCH_PREFIX>-<run id>" of the run.
+    """
+    like = ["like", f"{prefix}-%"]
+    customers = frappe.get_all("Customer", filters={"customer_name": like}, pluck="name")
+    leads = frappe.get_all("Lead", filters={"company_name": like}, pluck="name")
+    if customers:
+        frappe.db.delete("Party Account", {"parenttype": "Customer", "parent": ["in", customers]})
+        frappe.db.delete("Customer", {"name": ["in", customers]})
+    frappe.db.delete("Camp Settings", {"name": like})
+    frappe.db.delete("Onboarding", {"name": like})
+    frappe.db.delete("Camp", {"name": like})
+    frappe.db.delete("Other Organization", {"name": like})
+    if leads:
+        frappe.db.delete("Comment", {"reference_doctype": "Lead", "reference_name": ["in", leads]})
+        frappe.db.delete("Lead", {"name": ["in", leads]})
+
+    # Rows the save pipeline writes alongside the records: change log, blocking keys, comments, intakes
+    frappe.db.delete("Organization Change Log", {"ref_name": like})
+    frappe.db.delete("Organization Blocking Key", {"ref_name": like})
+    frappe.db.delete("Comment", {"reference_name": like})
+    if customers:
+        frappe.db.delete("Comment", {"reference_doctype": "Customer", "reference_name": ["in", customers]})
+    frappe.db.delete("Google Form Intake", {"camp_name": like})
+    frappe.db.commit()
+    refresh_phase_summary()
+
+
+def _insert_organization(doctype, name):
+    org = frappe.new_doc(doctype)
+    org.organization_name = name
+    org.contact_name = "Benchmark Contact"
+    org.email = f"{frappe.scrub(name)}@example.com"
+    org.phone = "555-0100"
+    org.country_shipping_address = "United States"
+    org.insert(ignore_permissions=True)
+
+
+def _save_camp(name):
+    camp = frappe.get_doc("Camp", name)
+    camp.phone = f"555-{frappe.generate_hash(length=4)}"
+    camp.save(ignore_permissions=True)
+
+
+def _save_onboarding(name):
+    # A shared field, so the save also syncs the change to the Camp
+    onboarding = frappe.get_doc("Onboarding", name)
+    onboarding.city_shipping_address = f"City {frappe.generate_hash(length=4)}"
+    onboarding.chose_service_package = 0 if onboarding.chose_service_package else 1
+    onboarding.save(ignore_permissions=True)
+
+
+def _seed_leads(prefix, count):
+    # db_insert skips the Lead hooks, so no conversion jobs are queued while seeding
+    names = []
+    for i in range(count):
+        lead = frappe.new_doc("Lead")
+        lead.update({
+            "company_name": f"{prefix}-lead-{i}",
+            "custom_organization_type": "Camp" if i % 2 else "Other Organization",
+            "custom_contact_name": "Benchmark Contact",
+            "email_id": f"lead{i}@example.com",
+            "custom_phase": "Signed",
+        })
+        lead.set_new_name()
+        lead.db_insert()
+        names.append(lead.name)
+    frappe.db.commit()
+    return names
+
+
+def _benchmark_webhook(camps):
+    # A temporary rotation token lets the benchmark call the endpoint without knowing the site's token
+    token = frappe.generate_hash(length=32)
+    previous = frappe.db.get_single_value("Google Form Sync Settings", "previous_secret_tokens") or ""
+    frappe.db.set_single_value("Google Form Sync Settings", "previous_secret_tokens", f"{previous}\n{token}".strip())
+    frappe.db.commit()
+    clear_token_cache()
+
+    def submit(camp_name):
+        frappe.local.form_dict = frappe._dict(
+            secret_token=token, camp_name=camp_name, first_day_of_camp=FORM_DATE, num_campers="100"
+        )
+        result = create_from_google_form()
+        if not result or result.get("status") != "success":
+            raise Exception(f"Webhook failed for {camp_name}: {result}")
+
+    try:
+        return measure(camps, submit)
+    finally:
+        frappe.db.set_single_value("Google Form Sync Settings", "previous_secret_tokens", previous)
+        frappe.db.commit()
+        clear_token_cache()
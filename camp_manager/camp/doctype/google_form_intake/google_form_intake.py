@@ -0,0 +1,26 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class GoogleFormIntake(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		attempts: DF.Int
+		camp_name: DF.Data | None
+		camp_settings: DF.Link | None
+		last_error: DF.LongText | None
+		payload: DF.Code | None
+		processed_on: DF.Datetime | None
+		status: DF.Literal["Queued", "Processing", "Processed", "Failed", "Dead Letter"]
+	# end: auto-generated types
+
+	pass
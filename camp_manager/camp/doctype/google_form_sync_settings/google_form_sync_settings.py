@@ -1,9 +1,11 @@
 # Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
+from camp_manager.api.tokens import clear_token_cache
+
 
 class GoogleFormSyncSettings(Document):
 	# begin: auto-generated types
@@ -14,7 +16,11 @@ class GoogleFormSyncSettings(Document):
 	if TYPE_CHECKING:
 		from frappe.types import DF
 
+		previous_secret_tokens: DF.SmallText | None
 		secret_token: DF.Data | None
 	# end: auto-generated types
 
-	pass
+	def on_update(self):
+		# Webhook token hashes are cached in process and in Redis. They are dropped once the save commits;
+		# dropping them earlier lets a concurrent request cache the old tokens again.
+		frappe.db.after_commit.add(clear_token_cache)
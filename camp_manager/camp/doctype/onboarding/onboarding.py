@@ -41,6 +41,7 @@ class Onboarding(Document):
 		organization_funfangle_id: DF.Data | None
 		organization_order_id: DF.Data | None
 		organization_type: DF.Literal["Camp", "Other Organization"]
+		phase_since: DF.Datetime | None
 		poc_email: DF.Data | None
 		poc_name: DF.Data | None
 		poc_phone_number: DF.Data | None
@@ -0,0 +1,26 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class OnboardingPhaseSummary(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		average_days_in_phase: DF.Float
+		exits: DF.Int
+		onboarding_count: DF.Int
+		phase: DF.Data
+		refreshed_on: DF.Datetime | None
+		stalled_count: DF.Int
+		total_days_in_phase: DF.Float
+	# end: auto-generated types
+
+	pass
@@ -0,0 +1,24 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class OrganizationBlockingKey(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		name: DF.Int | None
+		blocking_key: DF.Data
+		normalized_name: DF.Data | None
+		ref_doctype: DF.Link
+		ref_name: DF.DynamicLink
+	# end: auto-generated types
+
+	pass
@@ -0,0 +1,193 @@
+# functools.wraps keeps the wrapped hook's name and docstring (hooks.py refers to the original paths)
+import functools
+
+# Level constants for the debug-only cascade dump
+import logging
+
+# Time is used to measure how long each hook in the cascade takes
+import time
+
+# Frappe is used for database writes, logging and request-local state
+import frappe
+
+# Coalesced writes bypass the document hooks, so they are published to the change log here
+from camp_manager.change_log import record_updates
+
+# App logger; the cascade tree is only rendered when debug logging is on
+from camp_manager.logger import get_logger
+
+log = get_logger("cascade")
+
+# Saving one Onboarding can fan out into Camp, Customer, Account and Onboarding saves.
+# Anything nested deeper than this is almost certainly a save loop, so the hook is skipped.
+MAX_DEPTH = 8
+
+# Number of finished cascade trees kept per request for inspection
+MAX_TREES = 20
+
+
+def cascade_hook(fn):
+    """
+    Decorator for doc_event handlers that registers them with the per-request cascade coordinator.
+    - Records each hook call as a node in a cascade tree (doctype, name, hook, event, duration, children).
+    - Skips a hook that is already running for the same document higher up the stack (re-entrant save).
+    - Skips hooks nested deeper than MAX_DEPTH to stop runaway save loops.
+    - Flushes the writes collected by set_value() once, when the outermost hook returns.
+    Args:
+        fn: The hook function, called as fn(doc, method).
+    """
+    hook_name = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(doc, method=None, *args, **kwargs):
+        state = _get_state()
+        stack = state["stack"]
+        node = {
+            "doctype": doc.doctype,
+            "name": doc.name,
+            "hook": hook_name,
+            "method": method,
+            "children": [],
+        }
+        if stack:
+            stack[-1]["children"].append(node)
+
+        # Re-entrant call: the same hook is already running for this document
+        if any(frame["doctype"] == doc.doctype and frame["name"] == doc.name and frame["hook"] == hook_name
+               for frame in stack):
+            node["skipped"] = "re-entrant"
+            return None
+        if len(stack) >= MAX_DEPTH:
+            node["skipped"] = "max depth"
+            frappe.log_error(
+                f"Cascade deeper than {MAX_DEPTH} at {hook_name} for {doc.doctype} {doc.name}:\n"
+                f"{format_tree(state['stack'][0])}",
+                "Camp Manager Cascade Depth",
+            )
+            return None
+
+        stack.append(node)
+        start = time.monotonic()
+        succeeded = False
+        try:
+            result = fn(doc, method, *args, **kwargs)
+            succeeded = True
+            return result
+        finally:
+            node["duration_ms"] = round((time.monotonic() - start) * 1000, 2)
+            stack.pop()
+            if not stack:
+                _finish_cascade(state, node, succeeded)
+
+    return wrapper
+
+
+def in_progress(doctype, name):
+    """
+    Checks whether a hook is currently running for the given document anywhere up the stack.
+    Args:
+        doctype: Document type.
+        name: Document name.
+    Returns:
+        bool: True if the document is being saved further up the cascade.
+    """
+    state = _get_state()
+    return any(frame["doctype"] == doctype and frame["name"] == name for frame in state["stack"])
+
+
+def depth():
+    """Returns the number of cascade hooks currently running (0 outside any hook)."""
+    return len(_get_state()["stack"])
+
+
+def set_value(doctype, name, values):
+    """
+    Coalesced replacement for frappe.db.set_value inside hooks.
+    While a cascade is running, writes to the same document are merged and issued as one
+    UPDATE when the outermost hook returns. Outside a cascade the write happens immediately.
+    Args:
+        doctype: Document type to update.
+        name: Document name to update.
+        values: dict of {fieldname: value}.
+    """
+    state = _get_state()
+    if not state["stack"]:
+        frappe.db.set_value(doctype, name, values)
+        return
+    state["pending"].setdefault((doctype, name), {}).update(values)
+
+
+def save(doc, changes=None):
+    """
+    Saves a document from inside a hook without re-entering a save that is already in progress.
+    If the document is being saved further up the cascade, a nested save() would re-run its hooks and
+    fail the timestamp check of the outer save, so the given changes are queued with set_value() instead.
+    Args:
+        doc: The document to save (changes already applied to it).
+        changes: dict of the fields that were changed, used when the save has to be deferred.
+    Returns:
+        bool: True if the document was saved now, False if the write was deferred.
+    """
+    if in_progress(doc.doctype, doc.name):
+        if changes:
+            set_value(doc.doctype, doc.name, changes)
+        return False
+    doc.save(ignore_permissions=True)
+    return True
+
+
+def flush():
+    """Writes every pending coalesced update, one UPDATE per document."""
+    state = _get_state()
+    pending, state["pending"] = state["pending"], {}
+    for (doctype, name), values in pending.items():
+        frappe.db.set_value(doctype, name, values)
+        record_updates(doctype, [name], values)  # set_value skips the document hooks
+
+
+def get_cascade_trees():
+    """
+    Returns the cascade trees recorded during the current request, most recent last.
+    Each node has doctype, name, hook, method, duration_ms, children and, for skipped hooks, skipped.
+    """
+    return list(_get_state()["trees"])
+
+
+def format_tree(node, indent=0):
+    """
+    Renders a cascade tree as indented text, one hook per line, for logs and error reports.
+    Args:
+        node: Root node of the tree.
+        indent: Current indentation level (used for recursion).
+    """
+    line = f"{'  ' * indent}{node['doctype']} {node['name']} :: {node['hook']} ({node['method']})"
+    if node.get("skipped"):
+        line += f" [skipped: {node['skipped']}]"
+    elif "duration_ms" in node:
+        line += f" {node['duration_ms']} ms"
+    lines = [line]
+    for child in node["children"]:
+        lines.append(format_tree(child, indent + 1))
+    return "\n".join(lines)
+
+
+def _finish_cascade(state, root, succeeded):
+    # The outermost hook returned: apply the coalesced writes and keep the tree for inspection
+    try:
+        if succeeded:
+            flush()
+        else:
+            state["pending"] = {}  # the transaction is failing, drop the queued writes
+    finally:
+        state["trees"].append(root)
+        del state["trees"][:-MAX_TREES]
+        if root["children"] and log.is_enabled_for(logging.DEBUG):
+            log.debug("Save cascade:\n%s", format_tree(root))
+
+
+def _get_state():
+    # Cascade state lives on frappe.local so each request (or background job) has its own
+    state = getattr(frappe.local, "camp_manager_cascade", None)
+    if state is None:
+        state = frappe.local.camp_manager_cascade = {"stack": [], "pending": {}, "trees": []}
+    return state
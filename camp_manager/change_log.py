@@ -0,0 +1,167 @@
+# JSON is used to store the list of changed fields
+import json
+
+# Frappe is used to write the change log and for the whitelisted changes_since feed
+import frappe
+
+# Standard columns (name, modified, owner, ...) are never reported as changed fields
+from frappe.model import default_fields
+
+# Date helpers for the gap timeout and the retention purge
+from frappe.utils import add_days, cint, now_datetime, time_diff_in_seconds
+
+# Shared snapshot of the stored document, used to work out which fields changed in this save
+from camp_manager.snapshots import changed_fields
+
+# Doctypes whose changes are published to downstream systems
+TRACKED_DOCTYPES = ("Camp", "Other Organization", "Onboarding")
+
+CHANGE_LOG_DOCTYPE = "Organization Change Log"
+
+# The sequence number is assigned when the entry is written, not when its transaction commits, so a long
+# transaction can commit a lower number after a higher one. The feed stops at a missing number until it is
+# committed, or until the first entry after it is this old (the write was rolled back and never will be).
+GAP_TIMEOUT_SECONDS = 900
+
+# Page size limits for changes_since
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+# Entries older than this are purged by the daily job
+RETENTION_DAYS = 90
+
+
+def record_change(doc, method):
+    """
+    Hook (Camp / Other Organization / Onboarding on_update and on_trash): appends a change log entry.
+    Saves that change no data field are not logged.
+    Args:
+        doc: The document being saved or deleted.
+        method: The method triggering the hook.
+    """
+    if method == "on_trash":
+        _insert([(doc.doctype, doc.name, "Delete", [])])
+    elif doc.flags.in_insert:
+        # on_update also runs right after insert; every field that has a value is reported
+        fields = sorted(
+            f for f in doc.meta.get_valid_columns() if f not in default_fields and doc.get(f) not in (None, "")
+        )
+        _insert([(doc.doctype, doc.name, "Insert", fields)])
+    else:
+        fields = sorted(changed_fields(doc))
+        if fields:
+            _insert([(doc.doctype, doc.name, "Update", fields)])
+
+
+def record_rename(doc, method, old_name, new_name, merge=False):
+    """
+    Hook (after_rename): logs the rename under the new name, with the old name as the changed field.
+    Args:
+        doc: The renamed document.
+        method: The method triggering the hook.
+        old_name: Name before the rename.
+        new_name: Name after the rename.
+        merge: Whether the document was merged into an existing one.
+    """
+    _insert([(doc.doctype, new_name, "Rename", [old_name])])
+
+
+def record_updates(doctype, names, fields):
+    """
+    Logs changes made with direct database updates (which skip the document hooks), one entry per document.
+    Args:
+        doctype: Document type that was updated.
+        names: Names of the updated documents.
+        fields: Names of the updated fields.
+    """
+    if doctype not in TRACKED_DOCTYPES or not names or not fields:
+        return
+    fields = sorted(fields)
+    _insert([(doctype, name, "Update", fields) for name in names])
+
+
+@frappe.whitelist()
+def changes_since(seq=0, limit=DEFAULT_LIMIT):
+    """
+    Cursor-based change feed for Camps, Other Organizations and Onboardings.
+    Pass the next_seq of the previous page back as seq to get only the changes made since then.
+    The feed never moves past a sequence number that may still be committed: entries after a missing number
+    are held back (and waiting_for is set) until it appears or GAP_TIMEOUT_SECONDS have passed.
+    Args:
+        seq (int): Last sequence number already processed (0 for the full retained history).
+        limit (int): Maximum number of entries to return (capped at MAX_LIMIT).
+    Returns:
+        dict: {"changes": [{seq, doctype, name, operation, changed_fields, timestamp}],
+               "next_seq": int, "has_more": bool, "waiting_for": lowest missing seq or None}
+    """
+    frappe.has_permission(CHANGE_LOG_DOCTYPE, "read", throw=True)
+    seq = cint(seq)
+    limit = min(max(cint(limit), 1), MAX_LIMIT)
+
+    log = frappe.qb.DocType(CHANGE_LOG_DOCTYPE)
+    rows = (
+        frappe.qb.from_(log)
+        .select(log.name, log.ref_doctype, log.ref_name, log.operation, log.changed_fields, log.timestamp)
+        .where(log.name > seq)
+        .orderby(log.name)
+        .limit(limit + 1)  # One extra row tells us whether there is another page
+    ).run(as_dict=True)
+
+    rows, waiting_for = _contiguous(rows, seq)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = [
+        {
+            "seq": row.name,
+            "doctype": row.ref_doctype,
+            "name": row.ref_name,
+            "operation": row.operation,
+            "changed_fields": json.loads(row.changed_fields or "[]"),
+            "timestamp": row.timestamp,
+        }
+        for row in rows
+    ]
+    return {
+        "changes": changes,
+        "next_seq": rows[-1].name if rows else seq,
+        "has_more": has_more,
+        "waiting_for": waiting_for,
+    }
+
+
+def purge_change_log():
+    """Scheduled job (daily): deletes change log entries older than RETENTION_DAYS."""
+    frappe.db.delete(CHANGE_LOG_DOCTYPE, {"timestamp": ["<", add_days(now_datetime(), -RETENTION_DAYS)]})
+    frappe.db.commit()
+
+
+def _contiguous(rows, seq):
+    """
+    Cuts the rows at the first sequence number that is missing but may still be committed.
+    Returns:
+        tuple: (rows up to the gap, the missing seq or None).
+    """
+    now = now_datetime()
+    expected = seq + 1 if seq else None  # The full history starts at the oldest retained entry
+    for index, row in enumerate(rows):
+        if expected is not None and row.name > expected:
+            if time_diff_in_seconds(now, row.timestamp) < GAP_TIMEOUT_SECONDS:
+                return rows[:index], expected
+        expected = row.name + 1
+    return rows, None
+
+
+def _insert(entries):
+    # One multi-row INSERT; the autoincrement name is the sequence number
+    now = now_datetime()
+    user = frappe.session.user
+    values = [
+        [user, user, now, now, doctype, name, operation, json.dumps(fields), now]
+        for doctype, name, operation, fields in entries
+    ]
+    frappe.db.bulk_insert(
+        CHANGE_LOG_DOCTYPE,
+        ["owner", "modified_by", "creation", "modified", "ref_doctype", "ref_name", "operation",
+         "changed_fields", "timestamp"],
+        values,
+    )
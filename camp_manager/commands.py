@@ -0,0 +1,72 @@
+# Click builds the bench command and formats its output
+import click
+
+# Frappe is used to connect to the site the command runs against
+import frappe
+
+# Site resolution helpers shared by all bench commands
+from frappe.commands import get_site, pass_context
+
+
+@click.command("camp-manager-audit-indexes")
+@click.option("--fix", is_flag=True, default=False, help="Create the missing indexes after reporting them.")
+@pass_context
+def audit_indexes(context, fix=False):
+    """Report missing indexes and full-scan query plans for every lookup Camp Manager issues."""
+    # Imported here so bench can list commands without loading the app modules
+    from camp_manager.indexes import audit_lookups, ensure_indexes
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        problems = 0
+        for row in audit_lookups():
+            if row.get("error"):
+                status = row["error"]
+            elif not row["index"]:
+                status = "MISSING INDEX"
+            elif row["full_scan"]:
+                status = "FULL SCAN"
+            else:
+                status = "ok"
+            if status != "ok":
+                problems += 1
+            click.echo(
+                f"{status:<14} {row['doctype']}.{row['fields']:<40} index={row.get('index') or '-'} "
+                f"plan={row.get('plan_type') or '-'}/{row.get('plan_key') or '-'} rows={row.get('rows') or '-'} "
+                f"({row['used_by']})"
+            )
+
+        if fix:
+            created = ensure_indexes()
+            frappe.db.commit()
+            click.echo(f"Created {len(created)} index(es): {', '.join(created) or '-'}")
+        elif problems:
+            click.echo(f"{problems} lookup(s) need attention; run with --fix to add the missing indexes.")
+    finally:
+        frappe.destroy()
+
+
+@click.command("camp-manager-benchmark")
+@click.option("--n", "n", type=int, default=50, help="Records seeded and operations measured per benchmark.")
+@click.option("--output", default=None, help="Write the JSON report to this file.")
+@click.option("--keep", is_flag=True, default=False, help="Keep the seeded records.")
+@pass_context
+def benchmark(context, n=50, output=None, keep=False):
+    """Benchmark Camp/Onboarding saves, lead conversion and the Google Form webhook (use a test site)."""
+    import json
+
+    from camp_manager.benchmarks import run
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        report = run(n=n, output=output, keep=int(keep))
+        click.echo(json.dumps(report, indent=1, default=str))
+    finally:
+        frappe.destroy()
+
+
+commands = [audit_indexes, benchmark]
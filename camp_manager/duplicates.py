@@ -0,0 +1,394 @@
+# difflib scores name similarity within a block
+import difflib
+
+# re and unicodedata normalize names, email addresses, phone numbers and zip codes
+import re
+import unicodedata
+
+# Frappe is used for the blocking key table, the cluster scan job and its cached result
+import frappe
+
+# Count drives the GROUP BY that finds the blocks worth comparing
+from frappe.query_builder.functions import Count
+
+# App logger for the cluster scan summary
+from camp_manager.logger import get_logger
+
+# Stored version of a document, to skip saves that did not touch a field the keys are built from
+from camp_manager.snapshots import get_original
+
+log = get_logger("duplicates")
+
+
+BLOCKING_KEY_DOCTYPE = "Organization Blocking Key"
+
+# Organization fields the blocking keys are built from
+KEY_FIELDS = (
+    "organization_name", "email", "phone", "office_phone", "zip_code_shipping_address", "zip_code_billing_address"
+)
+
+# Words that do not tell organizations apart: legal forms, filler, and words most of our names share
+STOP_WORDS = frozenset({
+    "the", "and", "of", "at", "inc", "incorporated", "llc", "ltd", "limited", "co", "corp", "corporation",
+    "company", "camp", "camps", "summer", "day", "association", "assn", "org", "organization",
+})
+
+# Shared mailbox providers; their domain says nothing about the organization
+FREE_EMAIL_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com", "yahoo.com", "hotmail.com", "outlook.com", "live.com", "msn.com",
+    "aol.com", "icloud.com", "me.com", "comcast.net", "att.net", "verizon.net", "protonmail.com",
+})
+
+# Shorter name tokens are too common to block on
+MIN_TOKEN_LENGTH = 4
+
+# Blocks with more members than this (a very common token or zip code) are not compared pairwise
+MAX_BLOCK_SIZE = 200
+
+# Organizations scoring at least CANDIDATE_SCORE are reported as possible duplicates (never merged or skipped)
+CANDIDATE_SCORE = 0.8
+
+# Added to the name similarity of organizations sharing a phone number or an exact email address.
+# A shared email domain only puts organizations in the same block: sibling camps of one operator share it.
+CONTACT_BONUS = 0.1
+CONTACT_PREFIXES = ("phone:", "mailbox:")
+
+# Blocks fetched per query by the cluster scan
+BLOCK_BATCH_SIZE = 1000
+
+# Redis key holding the result of the last cluster scan
+CLUSTERS_CACHE_KEY = "camp_manager:duplicate_clusters"
+
+
+def name_tokens(name):
+    """
+    Splits an organization name into lowercase ASCII words, without punctuation or stop words.
+    Args:
+        name (str): Organization name.
+    Returns:
+        list[str]: e.g. ["wild", "wood"] for "Camp Wild Wood, Inc.".
+    """
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode().lower()
+    return [token for token in re.split(r"[^a-z0-9]+", text) if token and token not in STOP_WORDS]
+
+
+def normalize_name(name):
+    """
+    Returns the form of an organization name that duplicates are compared on: its significant words, joined
+    without spaces, so "Camp Wildwood" and "Camp Wild Wood, Inc." both become "wildwood".
+    A name made of stop words only keeps all of its words.
+    """
+    compact = "".join(name_tokens(name))
+    if not compact:
+        text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode().lower()
+        compact = re.sub(r"[^a-z0-9]+", "", text)
+    return compact or None
+
+
+def blocking_keys(values):
+    """
+    Builds the blocking keys of an organization. Only organizations sharing at least one key are compared.
+    Args:
+        values (dict): Organization fields (see KEY_FIELDS); missing fields are skipped.
+    Returns:
+        list[str]: Keys prefixed with their kind: name:, token:, email: (domain), mailbox: (address), phone:, zip:.
+    """
+    keys = set()
+    name = normalize_name(values.get("organization_name"))
+    if name:
+        keys.add(f"name:{name}")
+        keys.update(
+            f"token:{token}" for token in name_tokens(values.get("organization_name")) if len(token) >= MIN_TOKEN_LENGTH
+        )
+
+    email = (values.get("email") or "").strip().lower()
+    domain = email.rpartition("@")[2] if "@" in email else None
+    if domain:
+        keys.add(f"mailbox:{email}")
+        if domain not in FREE_EMAIL_DOMAINS:
+            keys.add(f"email:{domain}")
+
+    for fieldname in ("phone", "office_phone"):
+        digits = re.sub(r"\D", "", values.get(fieldname) or "")
+        if len(digits) >= 7:
+            keys.add(f"phone:{digits[-10:]}")  # Drops the country code
+
+    for fieldname in ("zip_code_shipping_address", "zip_code_billing_address"):
+        zip_code = re.sub(r"[^A-Za-z0-9]", "", values.get(fieldname) or "").upper()
+        if len(zip_code) >= 3:
+            keys.add(f"zip:{zip_code[:5]}")  # ZIP+4 falls in the ZIP block
+
+    return sorted(key[:140] for key in keys)
+
+
+def similarity(name_a, name_b, shared_contact=False):
+    """
+    Scores two normalized names between 0 and 1, plus CONTACT_BONUS (capped at 1) when the organizations
+    share a phone number or an email address.
+    """
+    if not name_a or not name_b:
+        return 0.0
+    score = difflib.SequenceMatcher(None, name_a, name_b).ratio()
+    if shared_contact:
+        score += CONTACT_BONUS
+    return min(score, 1.0)
+
+
+def find_duplicates(values, exclude=None, min_score=CANDIDATE_SCORE):
+    """
+    Finds the existing organizations (Camps and Other Organizations) that look like the given one, with
+    one indexed query on the blocking keys; no organization is loaded.
+    Args:
+        values (dict): Organization fields (see KEY_FIELDS).
+        exclude (tuple): (doctype, name) of the organization itself, when it already exists.
+        min_score (float): Lowest score reported.
+    Returns:
+        list[frappe._dict]: {doctype, name, score} matches, best first.
+    """
+    name = normalize_name(values.get("organization_name"))
+    keys = blocking_keys(values)
+    if not name or not keys:
+        return []
+    rows = [row for row in _block_members(keys) if (row.ref_doctype, row.ref_name) != exclude]
+    return _matches(name, rows, min_score)
+
+
+def find_duplicates_many(values_list, min_score=CANDIDATE_SCORE):
+    """
+    find_duplicates for many new organizations, with one query on the blocking keys for all of them.
+    Each organization is also compared with the ones before it in the list, so a batch is checked against
+    itself as well as against the stored organizations.
+    Args:
+        values_list (list[dict]): Organization fields (see KEY_FIELDS), plus "doctype" and "name" under which
+            an organization is reported when it matches a later one in the list.
+        min_score (float): Lowest score reported.
+    Returns:
+        list[list[frappe._dict]]: The {doctype, name, score} matches of each organization, in list order.
+    """
+    keys_list = [blocking_keys(values) for values in values_list]
+    stored = {}
+    for row in _block_members(sorted({key for keys in keys_list for key in keys})):
+        stored.setdefault(row.blocking_key, []).append(row)
+
+    results, earlier = [], {}
+    for values, keys in zip(values_list, keys_list, strict=True):
+        name = normalize_name(values.get("organization_name"))
+        rows = [row for key in keys for row in stored.get(key, ()) + earlier.get(key, [])]
+        results.append(_matches(name, rows, min_score) if name else [])
+        if name and values.get("name"):
+            for key in keys:
+                earlier.setdefault(key, []).append(frappe._dict(
+                    ref_doctype=values.get("doctype"),
+                    ref_name=values["name"],
+                    normalized_name=name,
+                    blocking_key=key,
+                ))
+    return results
+
+
+def update_blocking_keys(doc, method=None, *args):
+    """
+    Hook (Camp / Other Organization on_update, on_trash, after_rename): keeps the organization's blocking
+    keys in step with it. Saves that do not change a KEY_FIELDS value cost nothing.
+    Args:
+        doc: The organization.
+        method: The method triggering the hook.
+        *args: For after_rename, the old and new names and the merge flag.
+    """
+    if method == "on_trash":
+        _delete_keys(doc.doctype, [doc.name])
+        return
+    if method == "after_rename":
+        old_name, new_name = args[:2]
+        merge = len(args) > 2 and args[2]
+        if merge:
+            _delete_keys(doc.doctype, [old_name])  # The surviving organization keeps its own keys
+        else:
+            table = frappe.qb.DocType(BLOCKING_KEY_DOCTYPE)
+            (
+                frappe.qb.update(table)
+                .set(table.ref_name, new_name)
+                .where((table.ref_doctype == doc.doctype) & (table.ref_name == old_name))
+            ).run()
+        return
+
+    if not doc.flags.in_insert:
+        original = get_original(doc)
+        if original is not None and all(doc.get(f) == original.get(f) for f in KEY_FIELDS):
+            return
+    _delete_keys(doc.doctype, [doc.name])
+    _insert_keys(doc.doctype, [doc])
+
+
+def rebuild_blocking_keys(doctypes=("Camp", "Other Organization"), batch_size=5000):
+    """
+    Rebuilds the whole blocking key table from the organizations (initial fill, or after changing the
+    normalization rules). Organizations are read and keys written batch_size at a time.
+    Returns:
+        int: Number of organizations indexed.
+    """
+    frappe.db.delete(BLOCKING_KEY_DOCTYPE)
+    indexed = 0
+    for doctype in doctypes:
+        start = 0
+        while True:
+            orgs = frappe.get_all(
+                doctype, fields=["name", *KEY_FIELDS], order_by="name", limit_start=start, limit_page_length=batch_size
+            )
+            if not orgs:
+                break
+            _insert_keys(doctype, orgs)
+            indexed += len(orgs)
+            start += batch_size
+    return indexed
+
+
+@frappe.whitelist()
+def enqueue_duplicate_scan():
+    """Queues find_duplicate_clusters as a background job (one at a time)."""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        find_duplicate_clusters,
+        queue="long",
+        job_id="camp_manager::find_duplicate_clusters",
+        deduplicate=True,
+    )
+
+
+@frappe.whitelist()
+def get_duplicate_clusters():
+    """
+    Returns the result of the last cluster scan.
+    Returns:
+        dict: {"generated_at", "clusters"} (see find_duplicate_clusters), or None if no scan ran yet.
+    """
+    frappe.only_for("System Manager")
+    return frappe.cache.get_value(CLUSTERS_CACHE_KEY)
+
+
+def find_duplicate_clusters(min_score=CANDIDATE_SCORE):
+    """
+    Groups every organization with its likely duplicates, without comparing all pairs.
+    One GROUP BY finds the blocks shared by 2 to MAX_BLOCK_SIZE organizations; their members are fetched
+    a batch of blocks at a time and only compared within their block. Matching pairs are merged into
+    clusters with union-find, so A~B and B~C end up in one cluster. The result is cached for
+    get_duplicate_clusters.
+    Args:
+        min_score (float): Lowest pair score that links two organizations.
+    Returns:
+        dict: {"generated_at", "clusters": [{"members": [{doctype, name}], "score": lowest linking score}]},
+            largest clusters first.
+    """
+    table = frappe.qb.DocType(BLOCKING_KEY_DOCTYPE)
+    members_count = Count("*")
+    blocks = (
+        frappe.qb.from_(table)
+        .select(table.blocking_key)
+        .groupby(table.blocking_key)
+        .having((members_count > 1) & (members_count <= MAX_BLOCK_SIZE))
+    ).run(pluck=True)
+
+    parent = {}
+    link_scores = {}
+
+    def find(ref):
+        parent.setdefault(ref, ref)
+        while parent[ref] != ref:
+            parent[ref] = parent[parent[ref]]
+            ref = parent[ref]
+        return ref
+
+    for start in range(0, len(blocks), BLOCK_BATCH_SIZE):
+        rows = (
+            frappe.qb.from_(table)
+            .select(table.blocking_key, table.ref_doctype, table.ref_name, table.normalized_name)
+            .where(table.blocking_key.isin(blocks[start:start + BLOCK_BATCH_SIZE]))
+        ).run(as_dict=True)
+        members = {}
+        for row in rows:
+            members.setdefault(row.blocking_key, []).append(row)
+
+        for key, block in members.items():
+            shared_contact = key.startswith(CONTACT_PREFIXES)
+            for i, a in enumerate(block):
+                for b in block[i + 1:]:
+                    ref_a, ref_b = (a.ref_doctype, a.ref_name), (b.ref_doctype, b.ref_name)
+                    if ref_a == ref_b or find(ref_a) == find(ref_b):
+                        continue  # Already in one cluster
+                    score = similarity(a.normalized_name, b.normalized_name, shared_contact)
+                    if score >= min_score:
+                        root = find(ref_a)
+                        parent[root] = find(ref_b)
+                        link_scores[ref_a] = min(link_scores.get(ref_a, 1.0), score)
+                        link_scores[ref_b] = min(link_scores.get(ref_b, 1.0), score)
+
+    clusters = {}
+    for ref in parent:
+        clusters.setdefault(find(ref), []).append(ref)
+    result = {
+        "generated_at": str(frappe.utils.now_datetime()),
+        "clusters": sorted(
+            (
+                {
+                    "members": [{"doctype": doctype, "name": name} for doctype, name in sorted(refs)],
+                    "score": round(min(link_scores[ref] for ref in refs), 3),
+                }
+                for refs in clusters.values()
+                if len(refs) > 1
+            ),
+            key=lambda cluster: -len(cluster["members"]),
+        ),
+    }
+    frappe.cache.set_value(CLUSTERS_CACHE_KEY, result)
+    log.info("Duplicate scan: %s cluster(s) in %s block(s)", len(result["clusters"]), len(blocks))
+    return result
+
+
+def _block_members(keys):
+    # Every stored key row in the given blocks, with one indexed IN query
+    if not keys:
+        return []
+    table = frappe.qb.DocType(BLOCKING_KEY_DOCTYPE)
+    return (
+        frappe.qb.from_(table)
+        .select(table.ref_doctype, table.ref_name, table.normalized_name, table.blocking_key)
+        .where(table.blocking_key.isin(keys))
+    ).run(as_dict=True)
+
+
+def _matches(name, rows, min_score):
+    # Scores every organization among the key rows once; a shared phone or mailbox key earns the bonus
+    candidates = {}
+    for row in rows:
+        ref = (row.ref_doctype, row.ref_name)
+        candidate = candidates.setdefault(ref, {"name": row.normalized_name, "contact": False})
+        candidate["contact"] = candidate["contact"] or row.blocking_key.startswith(CONTACT_PREFIXES)
+
+    matches = []
+    for (doctype, ref_name), candidate in candidates.items():
+        score = similarity(name, candidate["name"], candidate["contact"])
+        if score >= min_score:
+            matches.append(frappe._dict(doctype=doctype, name=ref_name, score=round(score, 3)))
+    return sorted(matches, key=lambda match: -match.score)
+
+
+def _delete_keys(doctype, names):
+    frappe.db.delete(BLOCKING_KEY_DOCTYPE, {"ref_doctype": doctype, "ref_name": ["in", names]})
+
+
+def _insert_keys(doctype, orgs):
+    # One multi-row INSERT for every key of every organization
+    now = frappe.utils.now_datetime()
+    user = frappe.session.user
+    values = []
+    for org in orgs:
+        name = normalize_name(org.get("organization_name"))
+        for key in blocking_keys(org):
+            values.append([user, user, now, now, doctype, org.get("name"), key, name])
+    if values:
+        frappe.db.bulk_insert(
+            BLOCKING_KEY_DOCTYPE,
+            ["owner", "modified_by", "creation", "modified", "ref_doctype", "ref_name", "blocking_key",
+             "normalized_name"],
+            values,
+        )
@@ -0,0 +1,134 @@
+# hashlib gives a stable content hash per fixture record
+import hashlib
+
+# JSON is used to read fixture files and to store the hashes
+import json
+
+# os and tempfile hold the changed records while Frappe imports them
+import os
+import tempfile
+
+# Frappe is used to read the stored hashes and the current records, and to run the actual import
+import frappe
+
+# Frappe's fixture sync, whose import_doc is wrapped for the duration of a migrate
+import frappe.utils.fixtures
+
+# App logger
+from camp_manager.logger import get_logger
+
+log = get_logger("fixture_sync")
+
+
+# Global default (tabDefaultValue) holding the hashes of one fixture file, keyed by file name
+HASHES_KEY = "camp_manager_fixture_hashes:{}"
+
+
+def install():
+    """
+    Hook (before_migrate): makes this migrate's fixture sync import only the Camp Manager fixture records
+    that changed since they were last imported.
+    Every record of a fixture file is hashed; a record is skipped when its hash matches the one stored at
+    its last import and the database row still exists with the modified timestamp recorded at that import.
+    Records that are new, edited in the file, edited or deleted on the site are imported as usual, in one
+    import per file. Set camp_manager_full_fixture_sync in site config to import everything.
+    """
+    if frappe.conf.get("camp_manager_full_fixture_sync"):
+        return
+    if getattr(frappe.utils.fixtures.import_doc, "_camp_manager_original", None):
+        return  # Already installed in this process
+    original = frappe.utils.fixtures.import_doc
+
+    def import_doc(path, *args, **kwargs):
+        if os.path.dirname(os.path.abspath(path)) != fixtures_path():
+            return original(path, *args, **kwargs)
+        return import_changed_records(path, original, *args, **kwargs)
+
+    import_doc._camp_manager_original = original
+    frappe.utils.fixtures.import_doc = import_doc
+
+
+def uninstall():
+    """Hook (after_migrate): restores Frappe's fixture import."""
+    original = getattr(frappe.utils.fixtures.import_doc, "_camp_manager_original", None)
+    if original:
+        frappe.utils.fixtures.import_doc = original
+
+
+def fixtures_path():
+    return os.path.abspath(frappe.get_app_path("camp_manager", "fixtures"))
+
+
+def import_changed_records(path, import_doc, *args, **kwargs):
+    """
+    Imports the records of a fixture file that changed since their last import.
+    Args:
+        path (str): Fixture file.
+        import_doc: Frappe's import_doc, called with a temporary file holding only the changed records.
+    Returns:
+        int: Number of records imported.
+    """
+    with open(path) as fh:
+        records = json.load(fh)
+
+    key = HASHES_KEY.format(os.path.basename(path))
+    stored = json.loads(frappe.db.get_global(key) or "{}")
+    hashes = {_record_key(record): record_hash(record) for record in records}
+    current = _modified_timestamps(records)
+
+    changed = []
+    for record in records:
+        record_key = _record_key(record)
+        if record_key not in current or stored.get(record_key) != [hashes[record_key], current[record_key]]:
+            changed.append(record)
+    if changed:
+        _import_records(changed, import_doc, *args, **kwargs)
+        current.update(_modified_timestamps(changed))
+
+    # Hashes are rewritten whole, which also forgets records removed from the file
+    frappe.db.set_global(key, json.dumps({k: [h, current.get(k)] for k, h in hashes.items()}, sort_keys=True))
+    frappe.db.commit()
+    log.info("Fixture %s: %s of %s record(s) imported", os.path.basename(path), len(changed), len(records))
+    return len(changed)
+
+
+def record_hash(record):
+    """
+    Content hash of a fixture record, independent of key order.
+    Args:
+        record (dict): Exported document.
+    Returns:
+        str: SHA-1 hex digest.
+    """
+    payload = json.dumps(record, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _record_key(record):
+    return f"{record.get('doctype')}::{record.get('name')}"
+
+
+def _modified_timestamps(records):
+    # One query per doctype; records missing from the database are absent from the result
+    names_by_doctype = {}
+    for record in records:
+        names_by_doctype.setdefault(record.get("doctype"), []).append(record.get("name"))
+
+    timestamps = {}
+    for doctype, names in names_by_doctype.items():
+        if not doctype or not frappe.db.table_exists(doctype):
+            continue
+        for row in frappe.get_all(doctype, filters={"name": ["in", names]}, fields=["name", "modified"]):
+            timestamps[f"{doctype}::{row.name}"] = str(row.modified)
+    return timestamps
+
+
+def _import_records(records, import_doc, *args, **kwargs):
+    # Frappe imports fixtures from files, so the changed records are written to a temporary one
+    fd, tmp_path = tempfile.mkstemp(suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            json.dump(records, fh)
+        import_doc(tmp_path, *args, **kwargs)
+    finally:
+        os.remove(tmp_path)
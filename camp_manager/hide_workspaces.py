@@ -1,30 +1,42 @@
 import frappe
-from frappe.exceptions import LinkValidationError
+from camp_manager.logger import get_logger
+
+log = get_logger("hide_workspaces")
+
+WORKSPACES_TO_HIDE = [
+    "Home",
+    "Accounting",
+    "Buying",
+    "Selling",
+    "Stock",
+    "Assets",
+    "Manufacturing",
+    "Quality",
+    "Projects",
+    "CRM",
+    "Settings"
+]
+
 
 def hide_erpnext_workspaces():
-    workspace_names_to_hide = [
-        "Home",
-        "Accounting",
-        "Buying",
-        "Selling",
-        "Stock",
-        "Assets",
-        "Manufacturing",
-        "Quality",
-        "Projects",
-        "CRM",
-        "Settings"
-    ]
+    # One lookup and one UPDATE for all workspaces; skipping validation also avoids broken-link failures
+    ws = frappe.qb.DocType("Workspace")
+    existing = frappe.get_all("Workspace", filters={"name": ["in", WORKSPACES_TO_HIDE]}, pluck="name")
+    if existing:
+        (
+            frappe.qb.update(ws)
+            .set(ws.is_hidden, 1)
+            .set(ws.type, "Workspace")
+            .where(ws.name.isin(existing))
+        ).run()
+        frappe.cache.delete_value("bootinfo")
+    for name in WORKSPACES_TO_HIDE:
+        if name in existing:
+            log.info("Workspace %s hidden", name)
+        else:
+            log.info("Workspace %s not found, skipped", name)
+
 
-    for name in workspace_names_to_hide:
-        try:
-            ws = frappe.get_doc("Workspace", name)
-            ws.hidden = 1
-            ws.type = "Workspace"
-            try:
-                ws.save(ignore_permissions=True)
-                print(f"Workspace '{name}' hidden.")
-            except LinkValidationError as e:
-                print(f"Workspace '{name}' skipped due to broken link: {e}")
-        except frappe.DoesNotExistError:
-            print(f"Workspace '{name}' not found. Skipped.")
+def execute():
+    # Listed in patches.txt, so existing sites get the workspaces hidden on migrate as well
+    hide_erpnext_workspaces()
@@ -71,6 +71,30 @@ override_whitelisted_methods = {
 
 after_install = "camp_manager.hide_workspaces.hide_erpnext_workspaces"
 
+# Fixture records are hashed so migrate only re-imports the ones that changed
+before_migrate = "camp_manager.fixture_sync.install"
+after_migrate = "camp_manager.fixture_sync.uninstall"
+
+# Scheduled background jobs
+scheduler_events = {
+    "hourly": [
+        # Convert Signed leads whose background conversion failed or was never queued
+        "camp_manager.lead_hooks.convert_signed_leads"
+    ],
+    "daily": [
+        # Recount the onboarding pipeline summary and refresh stalled counts
+        "camp_manager.onboarding_pipeline.refresh_phase_summary",
+        # Drop change log entries past the retention period
+        "camp_manager.change_log.purge_change_log"
+    ],
+    "cron": {
+        # Re-queue Google Form submissions whose background processing failed or was lost
+        "*/5 * * * *": [
+            "camp_manager.api.create_entry.retry_failed_intakes"
+        ]
+    }
+}
+
 # doc_events map document events (like on_update, before_save) to Python functions
 # This is the heart of the app's business logic integration with ERPNext
 doc_events = {
@@ -79,19 +103,89 @@ doc_events = {
         "on_update": "camp_manager.lead_hooks.enqueue_lead_conversion"
     },
     "Camp": {
-        # When a Camp is updated, create related Customer/Onboarding if needed
-        "on_update": "camp_manager.organization_hooks.organization_creation",
+        # When a Camp is updated, create related Customer/Onboarding if needed, publish the change and refresh its blocking keys
+        "on_update": [
+            "camp_manager.organization_hooks.organization_creation",
+            "camp_manager.change_log.record_change",
+            "camp_manager.identity.invalidate",
+            "camp_manager.duplicates.update_blocking_keys"
+        ],
         # Before saving a Camp, run organization hooks for currency, discount, etc.
-        "before_save": "camp_manager.utils.organization_hooks"
+        "before_save": "camp_manager.utils.organization_hooks",
+        # Publish deletes and renames to the change log, drop the cached identity and the blocking keys
+        "on_trash": [
+            "camp_manager.change_log.record_change",
+            "camp_manager.identity.invalidate",
+            "camp_manager.duplicates.update_blocking_keys"
+        ],
+        "after_rename": [
+            "camp_manager.change_log.record_rename",
+            "camp_manager.identity.invalidate",
+            "camp_manager.duplicates.update_blocking_keys"
+        ]
     },
     "Other Organization": {
-        # When an Other Organization is updated, create related Customer/Onboarding if needed
-        "on_update": "camp_manager.organization_hooks.organization_creation",
+        # When an Other Organization is updated, create related Customer/Onboarding if needed, publish the change and refresh its blocking keys
+        "on_update": [
+            "camp_manager.organization_hooks.organization_creation",
+            "camp_manager.change_log.record_change",
+            "camp_manager.identity.invalidate",
+            "camp_manager.duplicates.update_blocking_keys"
+        ],
         # Before saving, run organization hooks for currency, discount, etc.
-        "before_save": "camp_manager.utils.organization_hooks"
+        "before_save": "camp_manager.utils.organization_hooks",
+        # Publish deletes and renames to the change log, drop the cached identity and the blocking keys
+        "on_trash": [
+            "camp_manager.change_log.record_change",
+            "camp_manager.identity.invalidate",
+            "camp_manager.duplicates.update_blocking_keys"
+        ],
+        "after_rename": [
+            "camp_manager.change_log.record_rename",
+            "camp_manager.identity.invalidate",
+            "camp_manager.duplicates.update_blocking_keys"
+        ]
+    },
+    "Customer": {
+        # Customers are part of the cached organization identity
+        "on_update": "camp_manager.identity.invalidate",
+        "on_trash": "camp_manager.identity.invalidate",
+        "after_rename": "camp_manager.identity.invalidate"
+    },
+    "Camp Settings": {
+        # Camp Settings are part of the cached organization identity
+        "after_insert": "camp_manager.identity.invalidate",
+        "on_trash": "camp_manager.identity.invalidate",
+        "after_rename": "camp_manager.identity.invalidate"
+    },
+    "Account": {
+        # Drop the cached receivable parents / Debtors accounts when accounts change
+        "on_update": "camp_manager.receivables.clear_account_cache",
+        "on_trash": "camp_manager.receivables.clear_account_cache",
+        "after_rename": "camp_manager.receivables.clear_account_cache"
+    },
+    "Company": {
+        # The default company is cached as well
+        "on_update": "camp_manager.receivables.clear_account_cache",
+        "on_trash": "camp_manager.receivables.clear_account_cache"
     },
     "Onboarding": {
         # Before saving Onboarding, update phase and sync with linked org/camp
-        "before_save": "camp_manager.onboarding_hooks.manage_onboarding"
+        "before_save": "camp_manager.onboarding_hooks.manage_onboarding",
+        # Publish the change to the change log and drop the cached identity of a new Onboarding
+        "on_update": [
+            "camp_manager.change_log.record_change",
+            "camp_manager.identity.invalidate"
+        ],
+        # When an Onboarding is deleted, remove it from the pipeline summary and publish the delete
+        "on_trash": [
+            "camp_manager.onboarding_pipeline.remove_from_summary",
+            "camp_manager.change_log.record_change",
+            "camp_manager.identity.invalidate"
+        ],
+        "after_rename": [
+            "camp_manager.change_log.record_rename",
+            "camp_manager.identity.invalidate"
+        ]
     }
 }
\ No newline at end of file
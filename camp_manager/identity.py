@@ -0,0 +1,166 @@
+# Frappe is used for the joined lookup and the Redis cache
+import frappe
+
+# Stored version of a document, to tell whether an update touched one of the link fields
+from camp_manager.snapshots import get_original
+
+# Organization doctypes and the Customer field linking back to each of them
+ORGANIZATION_DOCTYPES = {
+    "Camp": "custom_camp_link",
+    "Other Organization": "custom_other_organization_link",
+}
+
+# Fields whose change (on update) can alter a cached identity
+LINK_FIELDS = {
+    "Camp": ("lead_link", "link_to_camp_settings"),
+    "Other Organization": ("lead_link",),
+    "Customer": ("custom_camp_link", "custom_other_organization_link", "customer_name"),
+    "Onboarding": ("title",),
+}
+
+# Redis hash holding one resolved identity per organization ("<doctype>::<name>" -> dict)
+IDENTITY_CACHE_KEY = "camp_manager:organization_identity:v2"
+
+
+def resolve(doctype, name):
+    """
+    Returns every record linked to an organization, cached in Redis.
+    Args:
+        doctype: "Camp" or "Other Organization".
+        name: Organization name.
+    Returns:
+        frappe._dict: {doctype, name, customer, named_customer, onboarding, lead, camp_settings}
+        (missing links are None), or None if the organization does not exist.
+    """
+    key = _cache_key(doctype, name)
+    identity = frappe.cache.hget(IDENTITY_CACHE_KEY, key)
+    if identity is None:
+        identity = resolve_many(doctype, [name]).get(name)
+        if identity is None:
+            return None
+        frappe.cache.hset(IDENTITY_CACHE_KEY, key, identity)
+    return frappe._dict(identity)
+
+
+def resolve_many(doctype, names):
+    """
+    Resolves the linked records of many organizations with a single query (the cache is not consulted).
+    The customer is the Customer linked through custom_camp_link / custom_other_organization_link only, so
+    code that writes to it never touches an unrelated Customer of the same name. named_customer is a Customer
+    whose customer_name equals the organization name, for provisioning to avoid creating a second one.
+    The Onboarding is the one titled after the organization; the Lead is the organization's lead_link; the
+    Camp Settings (Camps only) is the linked one or the one of the same name.
+    Args:
+        doctype: "Camp" or "Other Organization".
+        names: Organization names.
+    Returns:
+        dict: {organization name: frappe._dict identity} for the organizations that exist.
+    """
+    if doctype not in ORGANIZATION_DOCTYPES:
+        frappe.throw(f"Cannot resolve organizations of type {doctype}")
+    names = list(set(names))
+    if not names:
+        return {}
+
+    org = frappe.qb.DocType(doctype)
+    linked_customer = frappe.qb.DocType("Customer").as_("linked_customer")
+    named_customer = frappe.qb.DocType("Customer").as_("named_customer")
+    onboarding = frappe.qb.DocType("Onboarding")
+    query = (
+        frappe.qb.from_(org)
+        .left_join(linked_customer).on(linked_customer[ORGANIZATION_DOCTYPES[doctype]] == org.name)
+        .left_join(named_customer).on(named_customer.customer_name == org.name)
+        .left_join(onboarding).on(onboarding.title == org.name)
+        .select(
+            org.name,
+            org.lead_link,
+            linked_customer.name.as_("linked_customer"),
+            named_customer.name.as_("named_customer"),
+            onboarding.name.as_("onboarding"),
+        )
+        .where(org.name.isin(names))
+    )
+    if doctype == "Camp":
+        camp_settings = frappe.qb.DocType("Camp Settings")
+        query = query.left_join(camp_settings).on(camp_settings.name == org.name).select(
+            org.link_to_camp_settings, camp_settings.name.as_("named_camp_settings")
+        )
+
+    identities = {}
+    for row in query.run(as_dict=True):
+        if row.name in identities:
+            continue  # Several Customers can match; keep the first
+        identities[row.name] = frappe._dict(
+            doctype=doctype,
+            name=row.name,
+            customer=row.linked_customer,
+            named_customer=row.named_customer,
+            onboarding=row.onboarding,
+            lead=row.lead_link or None,
+            camp_settings=(row.get("link_to_camp_settings") or row.get("named_camp_settings")) or None,
+        )
+    return identities
+
+
+def invalidate(doc, method=None, *args):
+    """
+    Hook (insert / update / rename / delete of organizations, Customers, Onboardings and Camp Settings):
+    drops the cached identities the document can take part in. They are dropped right away, so the rest of
+    this request resolves the new links, and again once the transaction commits or rolls back (see
+    clear_after_commit).
+    Args:
+        doc: The document that changed.
+        method: The method triggering the hook.
+        *args: For after_rename, the old and new names.
+    """
+    fields = LINK_FIELDS.get(doc.doctype, ())
+    original = None
+    if method == "on_update" and not doc.flags.in_insert:
+        # Plain updates only matter when a link field changed; the old values are dropped as well
+        original = get_original(doc)
+        if original is not None and all(doc.get(f) == original.get(f) for f in fields):
+            return
+
+    names = {doc.name}
+    if method == "after_rename" and len(args) >= 2:
+        names.update(args[:2])
+    if doc.doctype == "Customer":
+        names.update(doc.get(fieldname) for fieldname in fields)
+    elif doc.doctype == "Onboarding":
+        names.add(doc.title)
+    if original is not None:
+        names.update(original.get(fieldname) for fieldname in fields if doc.doctype in ("Customer", "Onboarding"))
+    clear(names)
+    clear_after_commit(names)
+
+
+def clear(names=None):
+    """
+    Drops cached identities.
+    Args:
+        names: Organization names to drop (for both organization doctypes); all identities if None.
+    """
+    if names is None:
+        frappe.cache.delete_value(IDENTITY_CACHE_KEY)
+        return
+    keys = [_cache_key(doctype, name) for name in names if name for doctype in ORGANIZATION_DOCTYPES]
+    if keys:
+        frappe.cache.hdel(IDENTITY_CACHE_KEY, keys)
+
+
+def clear_after_commit(names):
+    """
+    Drops cached identities once the current transaction commits or rolls back. Until the commit, a concurrent
+    request still reads the old rows and can cache the old identity again; an identity resolved inside this
+    transaction must not outlive a rollback.
+    Args:
+        names: Organization names to drop.
+    """
+    names = [name for name in names if name]
+    if names:
+        frappe.db.after_commit.add(lambda: clear(names))
+        frappe.db.after_rollback.add(lambda: clear(names))
+
+
+def _cache_key(doctype, name):
+    return f"{doctype}::{name}"
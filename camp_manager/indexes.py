@@ -0,0 +1,110 @@
+# namedtuple keeps the lookup declarations short and readable
+from collections import namedtuple
+
+# Frappe is used to inspect and create the database indexes
+import frappe
+
+# One filter the app issues from its hooks/endpoints: the doctype, the filtered columns (leading column first)
+# and where the filter is used, so the audit can point at the code that pays for a missing index
+Lookup = namedtuple("Lookup", ["doctype", "fields", "used_by"])
+
+# Every lookup the app relies on. migrate (see patches.txt) makes sure each has an index on its leading column;
+# the app's own fields also declare search_index/unique in their doctype or custom field definitions.
+LOOKUPS = (
+    Lookup("Customer", ("custom_camp_link",), "utils.update_customer_info"),
+    Lookup("Customer", ("custom_other_organization_link",), "utils.update_customer_info"),
+    Lookup("Customer", ("customer_name",), "organization_hooks.organization_creation"),
+    Lookup("Onboarding", ("title",), "organization_hooks.organization_creation"),
+    Lookup("Camp", ("organization_name",), "lead_hooks.enqueue_lead_conversion"),
+    Lookup("Other Organization", ("organization_name",), "lead_hooks.enqueue_lead_conversion"),
+    Lookup("Lead", ("custom_phase",), "lead_hooks.convert_signed_leads"),
+    Lookup("Onboarding", ("phase_since",), "onboarding_pipeline.get_pipeline"),
+    Lookup("Google Form Intake", ("status",), "api.create_entry.retry_failed_intakes"),
+    Lookup("Account", ("company", "account_name"), "receivables.ensure_debtors_account"),
+    Lookup("Organization Blocking Key", ("blocking_key",), "duplicates.find_duplicates"),
+    Lookup("Organization Blocking Key", ("ref_name",), "duplicates.update_blocking_keys"),
+    Lookup("Organization Change Log", ("ref_name",), "api.profile.get_organization_profiles"),
+)
+
+
+def ensure_indexes():
+    """
+    Adds an index for every lookup whose leading column is not indexed yet.
+    Existing indexes (primary key, unique constraints, search_index fields) are left untouched,
+    so running this on every migrate is safe.
+    Returns:
+        list[str]: "Doctype.field" of each index that was created.
+    """
+    created = []
+    for lookup in LOOKUPS:
+        if not frappe.db.table_exists(lookup.doctype) or get_covering_index(lookup):
+            continue
+        frappe.db.add_index(lookup.doctype, list(lookup.fields), index_name=index_name(lookup))
+        created.append(f"{lookup.doctype}.{'+'.join(lookup.fields)}")
+    return created
+
+
+def index_name(lookup):
+    """Returns the name of the index created for a lookup (e.g. 'custom_camp_link_index')."""
+    return "_".join(lookup.fields) + "_index"
+
+
+def get_covering_index(lookup):
+    """
+    Returns the name of an existing index whose first column is the lookup's leading column.
+    Args:
+        lookup (Lookup): The lookup to check.
+    Returns:
+        str: Index name, or None if the lookup has no usable index.
+    """
+    for row in frappe.db.sql(f"SHOW INDEX FROM `tab{lookup.doctype}`", as_dict=True):
+        if row.Seq_in_index == 1 and row.Column_name == lookup.fields[0]:
+            return row.Key_name
+    return None
+
+
+def audit_lookups():
+    """
+    Reports, for every declared lookup, the index that covers it and the query plan MariaDB chooses.
+    Returns:
+        list[dict]: One row per lookup with doctype, fields, used_by, index, plan_type, plan_key,
+        estimated rows and a "full_scan" flag for plans that read the whole table.
+    """
+    report = []
+    for lookup in LOOKUPS:
+        row = {
+            "doctype": lookup.doctype,
+            "fields": ", ".join(lookup.fields),
+            "used_by": lookup.used_by,
+        }
+        if not frappe.db.table_exists(lookup.doctype):
+            row["error"] = "table missing"
+            report.append(row)
+            continue
+
+        plan = explain_lookup(lookup)
+        row.update({
+            "index": get_covering_index(lookup),
+            "plan_type": plan.get("type"),
+            "plan_key": plan.get("key"),
+            "rows": plan.get("rows"),
+            "full_scan": plan.get("type") == "ALL",
+        })
+        report.append(row)
+    return report
+
+
+def explain_lookup(lookup):
+    """
+    Runs EXPLAIN on the equality filter the app issues for a lookup.
+    Args:
+        lookup (Lookup): The lookup to explain.
+    Returns:
+        dict: The first row of the EXPLAIN output (type, key, rows, ...).
+    """
+    table = frappe.qb.DocType(lookup.doctype)
+    query = frappe.qb.from_(table).select(table.name)
+    for fieldname in lookup.fields:
+        query = query.where(table[fieldname] == "")
+    plan = frappe.db.sql(f"EXPLAIN {query.get_sql()}", as_dict=True)
+    return plan[0] if plan else {}
@@ -0,0 +1,211 @@
+# contextlib builds the count_queries context manager
+import contextlib
+
+# functools.wraps keeps the wrapped handler's name and docstring (hooks.py refers to the original paths)
+import functools
+
+# random picks the sampled calls when camp_manager_hook_stats is a rate below 1
+import random
+
+# Time is used to measure wall time and query time
+import time
+
+# Frappe is used for the Redis cache, site config, logging and the whitelisted stats endpoint
+import frappe
+
+# Cascade depth of the save being measured
+from camp_manager import cascade
+
+# App loggers for recording failures and the slow-hook log
+from camp_manager.logger import get_logger
+
+log = get_logger("instrumentation")
+slow_log = get_logger("slow_hooks")
+
+# Redis hash per handler ("camp_manager:hook_stats:<handler>") and the set listing every handler seen
+STATS_KEY = "camp_manager:hook_stats"
+STATS_INDEX_KEY = "camp_manager:hook_stats:index"
+
+# Counters kept per handler
+STAT_FIELDS = ("calls", "total_ms", "queries", "query_ms", "slow_calls", "max_depth")
+
+
+def instrument(fn):
+    """
+    Decorator that measures a doc_event handler or endpoint.
+    Records wall time, number and duration of database queries (including nested saves), the cascade depth
+    the handler ran at and the document name, adds them to per-handler counters in Redis, and logs calls
+    slower than the camp_manager_slow_hook_ms site config value to the "camp_manager.slow_hooks" log.
+    Off unless camp_manager_hook_stats is set in site config: 1 measures every call, a rate such as 0.05
+    measures that share of the calls (the averages stay comparable; the call counts are sampled).
+    Args:
+        fn: The handler to measure.
+    """
+    handler = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _sampled():
+            return fn(*args, **kwargs)
+
+        depth = cascade.depth()
+        counter = _start_query_counter()
+        queries, query_ms = counter["queries"], counter["query_ms"]
+        start = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _stop_query_counter()  # First, so frappe.db.sql is restored whatever happens below
+            _record({
+                "handler": handler,
+                "document": _document_name(args),
+                "wall_ms": round((time.monotonic() - start) * 1000, 2),
+                "queries": counter["queries"] - queries,
+                "query_ms": round(counter["query_ms"] - query_ms, 2),
+                "depth": depth,
+            })
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def count_queries():
+    """
+    Counts the database queries issued inside a with block (used by the benchmarks and query-count tests).
+    Yields:
+        dict: {"queries": int, "query_ms": float}, filled in when the block exits.
+    """
+    counter = _start_query_counter()
+    queries, query_ms = counter["queries"], counter["query_ms"]
+    result = {"queries": 0, "query_ms": 0.0}
+    try:
+        yield result
+    finally:
+        _stop_query_counter()
+        result["queries"] = counter["queries"] - queries
+        result["query_ms"] = round(counter["query_ms"] - query_ms, 2)
+
+
+@frappe.whitelist()
+def get_hook_stats(reset=0):
+    """
+    Returns the counters collected by @instrument, slowest average first.
+    Args:
+        reset (int): If 1, clears the counters after reading them.
+    Returns:
+        list[dict]: One row per handler with calls, total_ms, avg_ms, queries, avg_queries, query_ms,
+        slow_calls and max_depth.
+    """
+    frappe.only_for("System Manager")
+    handlers = sorted(handler.decode() for handler in _redis().smembers(_key(STATS_INDEX_KEY)).execute()[0])
+    pipe = _redis()
+    for handler in handlers:
+        pipe.hgetall(_key(f"{STATS_KEY}:{handler}"))
+    counters = pipe.execute() if handlers else []
+
+    stats = []
+    for handler, raw in zip(handlers, counters, strict=True):
+        row = {field: float(raw.get(field.encode(), 0)) for field in STAT_FIELDS}
+        calls = int(row["calls"]) or 1
+        row.update({
+            "handler": handler,
+            "calls": int(row["calls"]),
+            "avg_ms": round(row["total_ms"] / calls, 2),
+            "avg_queries": round(row["queries"] / calls, 2),
+        })
+        stats.append(row)
+    stats.sort(key=lambda row: row["avg_ms"], reverse=True)
+
+    if frappe.utils.cint(reset):
+        keys = [_key(f"{STATS_KEY}:{handler}") for handler in handlers] + [_key(STATS_INDEX_KEY)]
+        _redis().delete(*keys).execute()
+    return stats
+
+
+def _record(sample):
+    # One pipelined round trip per call; the counters are incremented atomically by Redis
+    try:
+        key = _key(f"{STATS_KEY}:{sample['handler']}")
+        slow_ms = frappe.conf.get("camp_manager_slow_hook_ms")
+        is_slow = bool(slow_ms) and sample["wall_ms"] >= float(slow_ms)
+
+        pipe = _redis()
+        pipe.sadd(_key(STATS_INDEX_KEY), sample["handler"])
+        pipe.hincrby(key, "calls", 1)
+        pipe.hincrbyfloat(key, "total_ms", sample["wall_ms"])
+        pipe.hincrby(key, "queries", sample["queries"])
+        pipe.hincrbyfloat(key, "query_ms", sample["query_ms"])
+        if is_slow:
+            pipe.hincrby(key, "slow_calls", 1)
+        pipe.hget(key, "max_depth")
+        max_depth = pipe.execute()[-1]
+        # Deepest cascade seen; a plain read-then-write is good enough for a high-water mark
+        if sample["depth"] > int(max_depth or 0):
+            _redis().hset(key, "max_depth", sample["depth"]).execute()
+    except Exception:
+        # Stats must never break a save
+        log.exception("Could not record hook stats", sample=True)
+        return
+
+    if is_slow:
+        slow_log.warning(
+            "Slow hook %s (%s ms, %s queries / %s ms, depth %s) on %s",
+            sample["handler"], sample["wall_ms"], sample["queries"], sample["query_ms"], sample["depth"],
+            sample["document"],
+        )
+
+
+def _sampled():
+    # camp_manager_hook_stats: 0 / unset = off, 1 = every call, 0 < rate < 1 = that share of the calls
+    rate = frappe.utils.flt(frappe.conf.get("camp_manager_hook_stats"))
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def _redis():
+    # A raw Redis pipeline: frappe.cache's own hash/set helpers pickle values, which rules out HINCRBY
+    return frappe.cache.pipeline()
+
+
+def _key(key):
+    # Raw Redis commands bypass frappe.cache's own key handling, so add the site prefix here
+    return frappe.cache.make_key(key)
+
+
+def _document_name(args):
+    doc = args[0] if args else None
+    if getattr(doc, "doctype", None):
+        return f"{doc.doctype} {doc.name}"
+    return None
+
+
+def _start_query_counter():
+    # frappe.db.sql is wrapped once per request, by the outermost instrumented call, and unwrapped when it
+    # returns; nested calls only share the counter
+    counter = getattr(frappe.local, "camp_manager_query_counter", None)
+    if counter is None:
+        counter = frappe.local.camp_manager_query_counter = {"queries": 0, "query_ms": 0.0, "active": 0}
+    if not counter["active"]:
+        db = frappe.db
+        original = db.sql
+
+        def counting_sql(*args, **kwargs):
+            start = time.monotonic()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                counter["queries"] += 1
+                counter["query_ms"] += (time.monotonic() - start) * 1000
+
+        counter["patched"] = (db, original)
+        db.sql = counting_sql
+    counter["active"] += 1
+    return counter
+
+
+def _stop_query_counter():
+    # Restores the connection that was patched, even if frappe.db was replaced in between
+    counter = frappe.local.camp_manager_query_counter
+    counter["active"] = max(counter["active"] - 1, 0)
+    if not counter["active"] and "patched" in counter:
+        db, original = counter.pop("patched")
+        db.sql = original
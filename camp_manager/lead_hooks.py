@@ -1,19 +1,85 @@
 
+
 # Import Frappe for ERPNext document and database operations
 import frappe
 
+# Per-request cascade coordinator (re-entrancy guard, coalesced writes, cascade tree)
+from camp_manager import cascade
+
+# Fuzzy match against existing organizations, so near-duplicate leads are flagged for review
+from camp_manager.duplicates import find_duplicates_many
+
+# Wall time / query counters for the doc_event handlers (see get_hook_stats)
+from camp_manager.instrumentation import instrument
+
+# App logger for conversion audit messages
+from camp_manager.logger import get_logger
+
+log = get_logger("lead_hooks")
+
+# Organization doctype created for each Lead organization type (anything else becomes an Other Organization)
+ORGANIZATION_DOCTYPES = {"Camp": "Camp"}
+DEFAULT_ORGANIZATION_DOCTYPE = "Other Organization"
+
+# Lead fields needed to create the organization
+LEAD_FIELDS = ["name", "company_name", "custom_organization_type", "custom_contact_name", "email_id", "phone"]
+
+# Leads converted per transaction by the bulk converter
+CONVERSION_BATCH_SIZE = 50
+
+# Leads waiting for conversion; one without a company name cannot be converted until it gets one
+PENDING_FILTERS = {"custom_phase": "Signed", "custom_converted_to_customer": 0, "company_name": ["is", "set"]}
+
 
+@instrument
+@cascade.cascade_hook
 def enqueue_lead_conversion(doc, method):
     """
     Hook function to enqueue lead conversion when a Lead document is updated.
-    If the lead's custom_phase is 'Signed' and it hasn't been converted yet, triggers conversion.
+    If the lead's custom_phase is 'Signed' and it hasn't been converted yet, queues a background conversion,
+    so moving many leads to Signed from the list view does not wait for the organization/customer cascade.
     Args:
         doc: The Lead document being processed.
         method: The method triggering the hook (e.g., on_update).
     """
     # Only convert if lead is signed and not already converted
     if doc.custom_phase == "Signed" and not doc.custom_converted_to_customer:
-        convert_lead_to_camp_and_customer(doc)
+        frappe.enqueue(
+            convert_lead,
+            queue="default",
+            job_id=f"camp_manager::convert_lead::{doc.name}",
+            deduplicate=True,  # Repeat saves of the same lead collapse into the queued job
+            enqueue_after_commit=True,  # The job must see the committed Signed phase
+            lead=doc.name,
+        )
+
+
+def convert_lead(lead):
+    """
+    Background job: converts one Lead (queued by enqueue_lead_conversion).
+    Args:
+        lead: Name of the Lead to convert.
+    """
+    rows = frappe.get_all("Lead", filters={"name": lead, **PENDING_FILTERS}, fields=LEAD_FIELDS)
+    convert_leads(rows)
+
+
+def convert_signed_leads():
+    """
+    Scheduled job (hourly): converts every Signed lead that has not been converted yet.
+    Also picks up leads whose background conversion failed or was lost. Leads without a company name cannot
+    be converted and are left out until one is entered (saving the lead then queues its conversion).
+    Returns:
+        dict: {"created": [...], "existing": [...], "duplicates": [...], "failed": [...], "skipped": [...]}
+            lead names.
+    """
+    rows = frappe.get_all(
+        "Lead",
+        filters=PENDING_FILTERS,
+        fields=LEAD_FIELDS,
+        order_by="creation asc",
+    )
+    return convert_leads(rows, commit=True)
 
 
 def convert_lead_to_camp_and_customer(doc):
@@ -25,32 +91,137 @@ def convert_lead_to_camp_and_customer(doc):
     """
     # Early return if lead is not signed or already converted
     if doc.custom_phase != "Signed" or doc.custom_converted_to_customer:
-        print("early return")  # Log for debugging
         return  # already handled
-    
-    # If the organization type is Camp, create a Camp document if it doesn't exist
-    if doc.custom_organization_type == "Camp":
-        if not frappe.db.exists("Camp", {"organization_name": doc.company_name}):
-            frappe.logger().info(f"Creating Camp for {doc.company_name}")  # Log creation for audit
-            camp = frappe.new_doc("Camp")  # Create new Camp document
-            camp.organization_name = doc.company_name  # Set organization name
-            camp.contact_name = doc.custom_contact_name  # Set contact name
-            camp.email = doc.email_id  # Set email
-            camp.phone = doc.phone  # Set phone
-            camp.lead_link = doc.name  # Link to lead
-            camp.save(ignore_permissions=True)  # Save Camp, bypassing permissions
-            frappe.msgprint(f"Camp {camp.organization_name} created")  # Notify user in UI
-    else:
-        # If not Camp, create Other Organization document if it doesn't exist
-        if not frappe.db.exists("Other Organization", {"organization_name": doc.company_name}):
-            frappe.logger().info(f"Creating Camp for {doc.company_name}")  # Log creation for audit
-            other_org = frappe.new_doc("Other Organization")  # Create new Other Organization document
-            other_org.organization_name = doc.company_name  # Set organization name
-            other_org.contact_name = doc.custom_contact_name  # Set contact name
-            other_org.email = doc.email_id  # Set email
-            other_org.phone = doc.phone  # Set phone
-            other_org.lead_link = doc.name  # Link to lead
-            other_org.save(ignore_permissions=True)  # Save Other Organization, bypassing permissions
-            frappe.msgprint(f"Other Organization: {other_org.organization_name} created")  # Notify user in UI
-    # Mark the lead as converted to prevent duplicate conversion
-    frappe.db.set_value("Lead", doc.name, "custom_converted_to_customer", 1)
\ No newline at end of file
+    convert_leads([frappe._dict({fieldname: doc.get(fieldname) for fieldname in LEAD_FIELDS})])
+
+
+def convert_leads(leads, batch_size=CONVERSION_BATCH_SIZE, commit=False):
+    """
+    Creates the Camp / Other Organization of each lead and marks the leads as converted.
+    Existing organizations are found with one IN query per doctype, organizations are created in batches
+    (one commit per batch when commit is set), and each batch of leads is marked converted
+    with one UPDATE. A lead whose organization fails to save is rolled back on its own and left unconverted,
+    so the hourly job retries it. A lead without a company name is skipped and left unconverted.
+    A lead whose organization looks like an existing one with a different name, or like one created earlier
+    in the same batch, is still converted; the lead gets a comment naming the possible duplicates so someone
+    can review them. The duplicate check runs one blocking key query per batch.
+    Args:
+        leads: Rows (dicts) with the LEAD_FIELDS.
+        batch_size (int): Leads handled per transaction.
+        commit (bool): Commit after each batch, so finished batches are kept if a later one fails.
+    Returns:
+        dict: {"created": [...], "existing": [...], "duplicates": [...], "failed": [...], "skipped": [...]}
+            lead names.
+    """
+    skipped = [lead.name for lead in leads if not lead.company_name]
+    if skipped:
+        log.warning("Lead conversion skipped leads without a company name: %s", ", ".join(skipped))
+    result = {"created": [], "existing": [], "duplicates": [], "failed": [], "skipped": skipped}
+    leads = [lead for lead in leads if lead.company_name]
+    if not leads:
+        return result
+
+    # One IN lookup per organization doctype for the organizations that already exist
+    existing = {}
+    for doctype in set(_organization_doctype(lead) for lead in leads):
+        names = list({
+            lead.company_name for lead in leads if lead.company_name and _organization_doctype(lead) == doctype
+        })
+        existing[doctype] = set(frappe.get_all(
+            doctype, filters={"organization_name": ["in", names]}, pluck="organization_name"
+        )) if names else set()
+
+    failed = set()
+    for start in range(0, len(leads), batch_size):
+        batch = leads[start:start + batch_size]
+        # Looked up before the batch is inserted, so a new organization does not match itself
+        pending = [lead for lead in batch if lead.company_name not in existing[_organization_doctype(lead)]]
+        duplicates = dict(zip((lead.name for lead in pending), _find_duplicates(pending), strict=True))
+
+        converted = []
+        for lead in batch:
+            doctype = _organization_doctype(lead)
+            if lead.company_name in existing[doctype]:
+                result["existing"].append(lead.name)
+                converted.append(lead.name)
+                continue
+            # A match on an earlier lead of the batch only counts if its organization was created
+            matches = [match for match in duplicates[lead.name] if (match.doctype, match.name) not in failed]
+            frappe.db.savepoint("camp_manager_lead_conversion")
+            try:
+                _create_organization(doctype, lead)
+            except Exception:
+                frappe.db.rollback(save_point="camp_manager_lead_conversion")
+                frappe.log_error(frappe.get_traceback(), f"Lead Conversion Error: {lead.name}")
+                result["failed"].append(lead.name)
+                failed.add((doctype, lead.company_name))
+                continue
+            existing[doctype].add(lead.company_name)  # Two leads for one organization create it once
+            result["created"].append(lead.name)
+            converted.append(lead.name)
+            if matches:
+                _flag_duplicates(lead, matches)
+                result["duplicates"].append(lead.name)
+
+        # Mark the whole batch as converted to prevent duplicate conversion
+        if converted:
+            lead_table = frappe.qb.DocType("Lead")
+            (
+                frappe.qb.update(lead_table)
+                .set(lead_table.custom_converted_to_customer, 1)
+                .where(lead_table.name.isin(converted))
+            ).run()
+        if commit:
+            frappe.db.commit()
+
+    log.info(
+        "Lead conversion: %s created, %s already existed, %s flagged as possible duplicates, %s failed, "
+        "%s skipped",
+        len(result["created"]), len(result["existing"]), len(result["duplicates"]), len(result["failed"]),
+        len(result["skipped"]),
+    )
+    return result
+
+
+def _organization_doctype(lead):
+    return ORGANIZATION_DOCTYPES.get(lead.custom_organization_type, DEFAULT_ORGANIZATION_DOCTYPE)
+
+
+def _find_duplicates(leads):
+    # The organization each lead would create, under the name it gets (autoname: organization_name)
+    return find_duplicates_many([
+        {
+            "doctype": _organization_doctype(lead),
+            "name": lead.company_name,
+            "organization_name": lead.company_name,
+            "email": lead.email_id,
+            "phone": lead.phone,
+        }
+        for lead in leads
+    ])
+
+
+def _flag_duplicates(lead, matches):
+    # A comment on the lead asks for a review; the conversion itself is never blocked by a fuzzy match
+    listed = ", ".join(f"{match.doctype} {match.name} ({match.score})" for match in matches[:5])
+    log.warning("Lead %s converted, possible duplicate of %s", lead.name, listed)
+    frappe.get_doc({
+        "doctype": "Comment",
+        "comment_type": "Info",
+        "reference_doctype": "Lead",
+        "reference_name": lead.name,
+        "content": f"{lead.company_name} may be a duplicate of: {listed}. Please review.",
+    }).insert(ignore_permissions=True)
+
+
+def _create_organization(doctype, lead):
+    # The organization's own hooks create the Customer and Onboarding
+    log.info("Creating %s for %s", doctype, lead.company_name)  # Log creation for audit
+    org = frappe.new_doc(doctype)  # Create new Camp / Other Organization document
+    org.organization_name = lead.company_name  # Set organization name
+    org.contact_name = lead.custom_contact_name  # Set contact name
+    org.email = lead.email_id  # Set email
+    org.phone = lead.phone  # Set phone
+    org.lead_link = lead.name  # Link to lead
+    org.insert(ignore_permissions=True)  # Save organization, bypassing permissions
+    return org.name
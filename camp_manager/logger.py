@@ -0,0 +1,130 @@
+# Standard logging levels and lazy %-style formatting
+import logging
+
+# Time is used to rate-limit repeated messages
+import time
+
+# Frappe provides the rotating file loggers (logs/camp_manager.log) and site config
+import frappe
+
+# Name of the app's log file (logs/camp_manager.log) and parent of the per-module loggers
+LOGGER_NAME = "camp_manager"
+
+# Level used when the site config does not set camp_manager_log_level
+DEFAULT_LEVEL = "WARNING"
+
+# Sampled messages are written at most once per window per message template
+SAMPLE_WINDOW_SECONDS = 60
+
+# {(logger name, message template): [window start, suppressed count]}
+_samples = {}
+
+
+class AppLogger:
+    """
+    Level-gated logger for the app.
+    - Messages below camp_manager_log_level (site config, default WARNING) are dropped before any formatting.
+    - Messages use %-style arguments that are only formatted when the record is written.
+    - Keyword arguments are appended as key=value context.
+    - sample=True writes a repeated message at most once per SAMPLE_WINDOW_SECONDS and reports how many
+      were suppressed in between.
+    Records go to the app's rotating log file, never to stdout.
+    frappe.logger sets its own site level (log_level in site config) on the underlying logger, which would cap
+    camp_manager_log_level: an INFO record is dropped by a WARNING site logger. The configured level is
+    therefore set explicitly on the returned logger and its handlers, so camp_manager_log_level alone decides
+    what the app writes.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def is_enabled_for(self, level):
+        """Returns True if messages at this level would be written."""
+        return level >= _site_level()
+
+    def debug(self, msg, *args, **context):
+        self.log(logging.DEBUG, msg, *args, **context)
+
+    def info(self, msg, *args, **context):
+        self.log(logging.INFO, msg, *args, **context)
+
+    def warning(self, msg, *args, **context):
+        self.log(logging.WARNING, msg, *args, **context)
+
+    def error(self, msg, *args, **context):
+        self.log(logging.ERROR, msg, *args, **context)
+
+    def exception(self, msg, *args, **context):
+        """Logs at ERROR level with the current traceback; use only for unexpected errors."""
+        context["exc_info"] = True
+        self.log(logging.ERROR, msg, *args, **context)
+
+    def log(self, level, msg, *args, sample=False, exc_info=False, **context):
+        """
+        Writes one record if the level is enabled (and, when sampled, the message is due).
+        Args:
+            level (int): logging level.
+            msg (str): Message template with %-style placeholders.
+            *args: Values for the placeholders, formatted lazily.
+            sample (bool): Rate-limit this message template (see SAMPLE_WINDOW_SECONDS).
+            exc_info (bool): Attach the current traceback.
+            **context: Extra key=value pairs appended to the message.
+        """
+        threshold = _site_level()
+        if level < threshold:
+            return
+        if sample:
+            suppressed = _sample(self.name, msg)
+            if suppressed is None:
+                return
+            if suppressed:
+                context["suppressed"] = suppressed
+        if context:
+            msg = f"{msg} | " + " ".join(f"{key}=%r" for key in context)
+            args = args + tuple(context.values())
+        _get_logger(self.name, threshold).log(level, msg, *args, exc_info=exc_info)
+
+
+def get_logger(module=None):
+    """
+    Returns the app logger for a module.
+    Its level is camp_manager_log_level, applied over Frappe's site logger level (see AppLogger).
+    Args:
+        module (str): Short module name (e.g. "lead_hooks"), shown in each record as camp_manager.<module>.
+    Returns:
+        AppLogger
+    """
+    return AppLogger(f"{LOGGER_NAME}.{module}" if module else LOGGER_NAME)
+
+
+def _site_level():
+    # Read on every call so a site config change applies without a restart; getLevelName maps "INFO" -> 20
+    level = frappe.conf.get("camp_manager_log_level") or DEFAULT_LEVEL
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    return level if isinstance(level, int) else logging.WARNING
+
+
+def _get_logger(name, level):
+    # frappe.logger caches the logger per name; every module writes to the app's own log file.
+    # Its level and handlers follow Frappe's site level, so both are set to ours (setLevel clears the
+    # logging cache, hence only on change).
+    app_logger = frappe.logger(LOGGER_NAME, allow_site=True)
+    logger = app_logger if name == LOGGER_NAME else app_logger.getChild(name[len(LOGGER_NAME) + 1:])
+    for target in (logger, *app_logger.handlers):
+        if target.level != level:
+            target.setLevel(level)
+    return logger
+
+
+def _sample(name, msg):
+    # Returns None if the message should be dropped, else how many copies were dropped since the last one
+    key = (name, msg)
+    now = time.monotonic()
+    entry = _samples.get(key)
+    if entry and now - entry[0] < SAMPLE_WINDOW_SECONDS:
+        entry[1] += 1
+        return None
+    suppressed = entry[1] if entry else 0
+    _samples[key] = [now, 0]
+    return suppressed
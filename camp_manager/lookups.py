@@ -0,0 +1,162 @@
+# JSON is used to parse the lookup files (country -> currency, association -> discount)
+import json
+
+# OS is used to locate the lookup files next to this module and to read their modification times
+import os
+
+# Threading lock keeps concurrent gunicorn threads from parsing the same file at the same time
+import threading
+
+# Directory holding the lookup JSON files shipped with the app
+LOOKUP_DIR = os.path.dirname(__file__)
+
+# Alternative spellings that should resolve to the canonical key used in country_currency_map.json.
+# Keys and values are already normalized (see normalize_country).
+COUNTRY_ALIASES = {
+    "usa": "united states",
+    "us": "united states",
+    "u.s.": "united states",
+    "u.s.a.": "united states",
+    "united states of america": "united states",
+    "america": "united states",
+    "uk": "united kingdom",
+    "u.k.": "united kingdom",
+    "great britain": "united kingdom",
+    "britain": "united kingdom",
+    "england": "united kingdom",
+    "scotland": "united kingdom",
+    "wales": "united kingdom",
+    "northern ireland": "united kingdom",
+    "uae": "united arab emirates",
+    "south korea": "korea, south",
+    "republic of korea": "korea, south",
+    "north korea": "korea, north",
+    "czechia": "czech republic",
+    "holland": "netherlands",
+    "the netherlands": "netherlands",
+    "viet nam": "vietnam",
+    "russian federation": "russia",
+}
+
+
+def normalize_country(value):
+    """
+    Normalizes a country name for lookup: trims, lower-cases and collapses inner whitespace.
+    Args:
+        value: The raw country name (may be None).
+    Returns:
+        str: The normalized key, or an empty string if no value was given.
+    """
+    if not value:
+        return ""
+    return " ".join(str(value).split()).lower()
+
+
+def normalize_association(value):
+    """
+    Normalizes an association code for lookup (e.g. " aca " -> "ACA").
+    Args:
+        value: The raw association code (may be None).
+    Returns:
+        str: The normalized key, or an empty string if no value was given.
+    """
+    if not value:
+        return ""
+    return str(value).strip().upper()
+
+
+class LookupTable:
+    """
+    A lazily loaded, process-wide view of a JSON lookup file.
+    The file is parsed on first use and kept in memory. Every lookup does a cheap os.stat and
+    reloads the file only when its modification time or size changed, so edits to the JSON file
+    take effect without restarting the workers.
+    """
+
+    def __init__(self, filename, normalize, aliases=None):
+        self.path = os.path.join(LOOKUP_DIR, filename)
+        self.normalize = normalize
+        self.aliases = aliases or {}
+        self._version = None  # (mtime_ns, size) of the file that produced _data
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        # Raises FileNotFoundError when the file is missing, which callers handle
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """
+        Returns the normalized mapping, re-reading the file only if it changed on disk.
+        Raises:
+            FileNotFoundError: If the lookup file does not exist.
+            json.JSONDecodeError: If the lookup file is not valid JSON.
+        """
+        version = self._current_version()
+        if self._data is not None and version == self._version:
+            return self._data
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self._data is not None and version == self._version:
+                return self._data
+            with open(self.path) as file:
+                raw = json.load(file)
+            data = {self.normalize(key): value for key, value in raw.items()}
+            # Aliases only fill gaps; an explicit entry in the file always wins
+            for alias, target in self.aliases.items():
+                if alias not in data and target in data:
+                    data[alias] = data[target]
+            self._data = data
+            self._version = version
+            return data
+
+    def get(self, key, default=None):
+        """
+        Looks up a value by key after normalizing it.
+        Args:
+            key: The raw key (e.g. a country name as typed by a user).
+            default: Value returned when the key is empty or not found.
+        """
+        normalized = self.normalize(key)
+        if not normalized:
+            return default
+        return self.load().get(normalized, default)
+
+    def clear(self):
+        """Drops the in-memory copy so the next lookup re-reads the file."""
+        with self._lock:
+            self._data = None
+            self._version = None
+
+
+# Shared registry used by the organization hooks in utils.py
+country_currency = LookupTable("country_currency_map.json", normalize_country, COUNTRY_ALIASES)
+association_discounts = LookupTable("discounts.json", normalize_association)
+
+
+def get_currency_for_country(country, default="USD"):
+    """
+    Resolves the currency for a country name, accepting common aliases such as "USA".
+    Args:
+        country: Country name as entered on the document.
+        default: Currency used when the country is unknown.
+    Returns:
+        str: ISO currency code.
+    """
+    return country_currency.get(country, default)
+
+
+def get_discount_for_association(association):
+    """
+    Resolves the discount configured for an association code in discounts.json.
+    Args:
+        association: Association code (e.g. "ACA").
+    Returns:
+        The configured discount, or None if the association has no entry.
+    Raises:
+        FileNotFoundError: If discounts.json is missing.
+        json.JSONDecodeError: If discounts.json is not valid JSON.
+    """
+    return association_discounts.get(association)
@@ -0,0 +1,181 @@
+# Frappe is used for the bulk read/write of Onboarding rows and for background jobs
+import frappe
+
+# Change log entries for the bulk phase UPDATEs
+from camp_manager.change_log import record_updates
+
+# Onboarding checkboxes (and the wristband order link) that decide the phase.
+# Each field is assigned one bit, so an Onboarding's progress is a single integer mask.
+PHASE_FIELDS = (
+    "chose_service_package",
+    "selected_features",
+    "registration_identified",
+    "tax_exempt_id_gathered",
+    "first_day_of_camp_provided",
+    "collected_address",
+    "gathered_poc_information",
+    "account_setup",
+    "assigned_organization_order_id",
+    "assigned_organization_funfangle_id",
+    "set_up_parent_portal",
+    "set_up_admin_console",
+    "sent_retail_training_guide_if_needed",
+    "custom_set_discount",
+    "completed_datasettings_form",
+    "downloaded_funfangle_apps",
+    "camp_set_up_software",
+    "logobranding_recieved",
+    "wristband_and_scanner_order",
+    "custom_order_na",
+    "inventory_setup",
+    "care_packages_setup_if_using",
+    "registration_synced",
+    "special_requirements_fulfilled",
+    "tested_parent_invitation",
+    "live",
+)
+FIELD_BITS = {fieldname: 1 << bit for bit, fieldname in enumerate(PHASE_FIELDS)}
+
+# Rule modes: ALL fields must be set, or ANY one of them
+ALL = "all"
+ANY = "any"
+
+# Phase an Onboarding starts in when no rule matches
+DEFAULT_PHASE = "1"
+
+# Phase rules in ascending order; the last rule that matches decides the phase
+PHASE_RULES = (
+    # Phase 2: Registration, tax, and first day info gathered
+    ("2", ALL, ("chose_service_package", "selected_features", "registration_identified",
+                "tax_exempt_id_gathered", "first_day_of_camp_provided")),
+    # Phase 3: Address, POC, account setup, IDs, portal, admin, training, discount
+    ("3", ALL, ("collected_address", "gathered_poc_information", "account_setup",
+                "assigned_organization_order_id", "assigned_organization_funfangle_id", "set_up_parent_portal",
+                "set_up_admin_console", "sent_retail_training_guide_if_needed", "custom_set_discount")),
+    # Phase 4: Data settings, apps, software, branding
+    ("4", ALL, ("completed_datasettings_form", "downloaded_funfangle_apps", "camp_set_up_software",
+                "logobranding_recieved")),
+    # Phase 5: Wristband/scanner order or marked as not applicable
+    ("5", ANY, ("wristband_and_scanner_order", "custom_order_na")),
+    # Phase 6: Inventory and care packages setup
+    ("6", ALL, ("inventory_setup", "care_packages_setup_if_using")),
+    # Phase 7: Registration synced and special requirements fulfilled
+    ("7", ALL, ("registration_synced", "special_requirements_fulfilled")),
+    # Phase 8: Parent invitation tested
+    ("8", ALL, ("tested_parent_invitation",)),
+    # Final phase: Organization is live
+    ("Live", ALL, ("live",)),
+)
+
+
+def _compile_rules(rules):
+    compiled = []
+    for phase, mode, fieldnames in rules:
+        mask = 0
+        for fieldname in fieldnames:
+            mask |= FIELD_BITS[fieldname]
+        compiled.append((phase, mode, mask))
+    return tuple(compiled)
+
+
+COMPILED_RULES = _compile_rules(PHASE_RULES)
+
+
+def flags_to_mask(values):
+    """
+    Packs the phase fields of an Onboarding into a bitmask.
+    Args:
+        values: An Onboarding document or a dict/row holding the PHASE_FIELDS.
+    Returns:
+        int: Bitmask with one bit set per truthy field.
+    """
+    mask = 0
+    for fieldname, bit in FIELD_BITS.items():
+        if values.get(fieldname):
+            mask |= bit
+    return mask
+
+
+def phase_from_mask(mask):
+    """
+    Evaluates the phase rules against a bitmask of completed steps.
+    Args:
+        mask (int): Bitmask built by flags_to_mask.
+    Returns:
+        str: The phase ("1" to "8" or "Live").
+    """
+    phase = DEFAULT_PHASE
+    for rule_phase, mode, rule_mask in COMPILED_RULES:
+        if mode == ALL and mask & rule_mask == rule_mask:
+            phase = rule_phase
+        elif mode == ANY and mask & rule_mask:
+            phase = rule_phase
+    return phase
+
+
+def compute_phase(values):
+    """
+    Works out the onboarding phase for one Onboarding.
+    Args:
+        values: An Onboarding document or a dict/row holding the PHASE_FIELDS.
+    Returns:
+        str: The phase ("1" to "8" or "Live").
+    """
+    return phase_from_mask(flags_to_mask(values))
+
+
+@frappe.whitelist()
+def enqueue_phase_recalculation():
+    """
+    Queues recalculate_all_phases as a background job (e.g. after the phase rules changed).
+    Only one recalculation can be queued at a time.
+    """
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        recalculate_all_phases,
+        queue="long",
+        timeout=1800,
+        job_id="camp_manager::recalculate_onboarding_phases",
+        deduplicate=True,
+    )
+
+
+def recalculate_all_phases(batch_size=500):
+    """
+    Recomputes custom_phase for every Onboarding without saving the documents.
+    All phase fields are read in one query, each distinct combination of flags is evaluated once,
+    and only rows whose phase changed are written, with one UPDATE per phase and batch.
+    The pipeline summary is recounted afterwards.
+    Args:
+        batch_size (int): Maximum number of names per UPDATE statement.
+    Returns:
+        dict: {phase: number of Onboardings moved into that phase}
+    """
+    rows = frappe.get_all("Onboarding", fields=["name", "custom_phase", *PHASE_FIELDS])
+
+    phase_by_mask = {}  # Many Onboardings share the same progress, so evaluate each mask once
+    moves = {}
+    for row in rows:
+        mask = flags_to_mask(row)
+        if mask not in phase_by_mask:
+            phase_by_mask[mask] = phase_from_mask(mask)
+        phase = phase_by_mask[mask]
+        if row.custom_phase != phase:
+            moves.setdefault(phase, []).append(row.name)
+
+    onboarding = frappe.qb.DocType("Onboarding")
+    now = frappe.utils.now_datetime()
+    for phase, names in moves.items():
+        for start in range(0, len(names), batch_size):
+            (
+                frappe.qb.update(onboarding)
+                .set(onboarding.custom_phase, phase)
+                .set(onboarding.phase_since, now)
+                .where(onboarding.name.isin(names[start:start + batch_size]))
+            ).run()
+            record_updates("Onboarding", names[start:start + batch_size], ["custom_phase", "phase_since"])
+
+    # Imported here because onboarding_pipeline itself builds on the phase rules in this module
+    from camp_manager.onboarding_pipeline import refresh_phase_summary
+    refresh_phase_summary()  # Recounts the summary and commits
+    return {phase: len(names) for phase, names in moves.items()}
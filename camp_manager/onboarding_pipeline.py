@@ -0,0 +1,155 @@
+# Frappe is used for the summary table updates and the whitelisted pipeline endpoint
+import frappe
+
+# Query builder pieces for the grouped recount
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Count, Sum
+
+# Date helpers for phase durations and the stalled cutoff
+from frappe.utils import add_days, cint, now_datetime, time_diff_in_seconds
+
+# Every phase that can appear in the pipeline, in order
+from camp_manager.onboarding_phase import DEFAULT_PHASE, PHASE_RULES
+
+# Shared snapshot of the stored Onboarding, to see which phase it is leaving
+from camp_manager.snapshots import get_original
+
+# Onboardings that stay in one phase (other than Live) for longer than this are reported as stalled
+STALLED_AFTER_DAYS = 30
+
+# Summary table maintained by the Onboarding hooks
+SUMMARY_DOCTYPE = "Onboarding Phase Summary"
+
+# Phases in pipeline order: "1", "2", ..., "8", "Live"
+PHASES = (DEFAULT_PHASE, *(phase for phase, _, _ in PHASE_RULES))
+
+
+def track_phase_change(doc):
+    """
+    Keeps the Onboarding Phase Summary up to date when an Onboarding changes phase.
+    Called from manage_onboarding after update_phase. Only the two affected summary rows are touched,
+    with relative UPDATEs (count = count + 1), so the pipeline view never needs to scan Onboarding.
+    Args:
+        doc: The onboarding document being saved (custom_phase already computed).
+    """
+    original = get_original(doc)
+    old_phase = original.custom_phase if original else None
+    new_phase = doc.custom_phase
+    if old_phase == new_phase and doc.phase_since:
+        return
+
+    now = now_datetime()
+    if old_phase and old_phase != new_phase:
+        # Time spent in the phase we are leaving; unknown for Onboardings created before phase tracking
+        days = None
+        if original.phase_since:
+            days = time_diff_in_seconds(now, original.phase_since) / 86400
+        _adjust_phase(old_phase, count=-1, days=days)
+    if old_phase != new_phase:
+        _adjust_phase(new_phase, count=1)
+    doc.phase_since = now
+
+
+def remove_from_summary(doc, method):
+    """
+    Hook (Onboarding on_trash): removes a deleted Onboarding from the count of its phase.
+    Args:
+        doc: The Onboarding being deleted.
+        method: The method triggering the hook.
+    """
+    if doc.custom_phase:
+        _adjust_phase(doc.custom_phase, count=-1)
+
+
+def refresh_phase_summary():
+    """
+    Scheduled job (daily): recounts Onboardings and stalled Onboardings per phase with one grouped query.
+    The hooks keep the counts current during the day; this corrects any drift (e.g. rows changed with
+    direct database updates) and refreshes stalled_count, which depends on the passing of time.
+    """
+    onboarding = frappe.qb.DocType("Onboarding")
+    cutoff = add_days(now_datetime(), -STALLED_AFTER_DAYS)
+    stalled = Case().when(
+        (onboarding.phase_since < cutoff) & (onboarding.custom_phase != "Live"), 1
+    ).else_(0)
+    rows = (
+        frappe.qb.from_(onboarding)
+        .select(onboarding.custom_phase, Count("*"), Sum(stalled))
+        .groupby(onboarding.custom_phase)
+    ).run()
+    counts = {phase: (count, stalled_count) for phase, count, stalled_count in rows if phase}
+
+    now = now_datetime()
+    for phase in set(PHASES) | set(counts):
+        count, stalled_count = counts.get(phase, (0, 0))
+        _ensure_phase_row(phase)
+        frappe.db.set_value(SUMMARY_DOCTYPE, phase, {
+            "onboarding_count": count,
+            "stalled_count": stalled_count or 0,
+            "refreshed_on": now,
+        }, update_modified=False)
+    frappe.db.commit()
+
+
+@frappe.whitelist()
+def get_pipeline(stalled_limit=20):
+    """
+    Returns the onboarding pipeline for dashboards: one row per phase plus the longest-stalled Onboardings.
+    Phase rows come from the Onboarding Phase Summary table; the stalled list uses the indexed phase_since
+    column and is capped at stalled_limit rows.
+    Args:
+        stalled_limit (int): Maximum number of stalled Onboardings to return.
+    Returns:
+        dict: {"phases": [{phase, onboarding_count, stalled_count, average_days_in_phase}],
+               "stalled": [{name, title, custom_phase, phase_since}]}
+    """
+    frappe.has_permission(SUMMARY_DOCTYPE, "read", throw=True)
+    rows = frappe.get_all(
+        SUMMARY_DOCTYPE,
+        fields=["phase", "onboarding_count", "stalled_count", "average_days_in_phase", "refreshed_on"],
+    )
+    order = {phase: index for index, phase in enumerate(PHASES)}
+    rows.sort(key=lambda row: order.get(row.phase, len(order)))
+
+    stalled = frappe.get_all(
+        "Onboarding",
+        filters={
+            "phase_since": ["<", add_days(now_datetime(), -STALLED_AFTER_DAYS)],
+            "custom_phase": ["!=", "Live"],
+        },
+        fields=["name", "title", "custom_phase", "phase_since"],
+        order_by="phase_since asc",
+        limit=cint(stalled_limit),
+    )
+    return {"phases": rows, "stalled": stalled}
+
+
+def _adjust_phase(phase, count=0, days=None):
+    # Relative update so concurrent Onboarding saves never overwrite each other's counts
+    _ensure_phase_row(phase)
+    summary = frappe.qb.DocType(SUMMARY_DOCTYPE)
+    query = frappe.qb.update(summary).set(summary.onboarding_count, summary.onboarding_count + count)
+    if days is not None:
+        # The average is assigned first so it is computed from the old totals on every database
+        query = (
+            query.set(summary.average_days_in_phase, (summary.total_days_in_phase + days) / (summary.exits + 1))
+            .set(summary.exits, summary.exits + 1)
+            .set(summary.total_days_in_phase, summary.total_days_in_phase + days)
+        )
+    query.where(summary.name == phase).run()
+
+
+def _ensure_phase_row(phase):
+    # The summary has one row per phase; rows are created on first use and remembered per request
+    known = frappe.local.flags.setdefault("camp_manager_summary_phases", set())
+    if phase in known:
+        return
+    if not frappe.db.exists(SUMMARY_DOCTYPE, phase):
+        # A concurrent first update of the same phase can create the row in between; then its row is used
+        frappe.db.savepoint("camp_manager_summary_row")
+        try:
+            frappe.get_doc({"doctype": SUMMARY_DOCTYPE, "phase": phase}).insert(ignore_permissions=True)
+        except frappe.DuplicateEntryError:
+            frappe.db.rollback(save_point="camp_manager_summary_row")
+            frappe.clear_last_message()  # insert() announces the duplicate name
+    known.add(phase)
@@ -0,0 +1,203 @@
+# namedtuple keeps the field map declarations short and readable
+from collections import namedtuple
+
+# Frappe is used to load and save the linked Camp / Other Organization documents
+import frappe
+
+# Cascade coordinator, so a target that is already being saved up the stack is not saved re-entrantly
+from camp_manager import cascade
+
+# Shared snapshot of the stored Onboarding and the value comparison used across the save pipeline
+from camp_manager.snapshots import get_original, same_value
+
+# Sync modes for a mapped field:
+# TRUTHY         - copy the Onboarding value whenever it is set and differs from the target
+# DIFFERENT      - copy the Onboarding value (even an empty one) whenever it differs from the target
+# CHANGED        - copy the Onboarding value (even an empty one) when it changed since the last Onboarding save
+# CHANGED_TRUTHY - copy the Onboarding value when it is set and changed since the last Onboarding save
+TRUTHY = "truthy"
+DIFFERENT = "different"
+CHANGED = "changed"
+CHANGED_TRUTHY = "changed_truthy"
+
+# One Onboarding field mirrored onto a field of the linked organization
+# skip: Onboarding values that must never be copied (e.g. "Pending" tax status)
+FieldMap = namedtuple("FieldMap", ["source", "target", "mode", "skip"], defaults=[TRUTHY, ()])
+
+# Addresses are copied when they change on the Onboarding, for both organization doctypes
+ADDRESS_FIELDS = [
+    # Shipping Address
+    FieldMap("street_address_line_1_shipping_address", "street_address_line_1_shipping_address", CHANGED),
+    FieldMap("street_address_line_2_shipping_address", "street_address_line_2_shipping_address", CHANGED),
+    FieldMap("city_shipping_address", "city_shipping_address", CHANGED),
+    FieldMap("state_shipping_address", "state_shipping_address", CHANGED),
+    FieldMap("zip_code_shipping_address", "zip_code_shipping_address", CHANGED),
+    FieldMap("country_shipping_address", "country_shipping_address", CHANGED),
+    # Billing Address
+    FieldMap("street_address_line_1_billing_address", "street_address_line_1_billing_address", CHANGED),
+    FieldMap("street_address_line_2_billing_address", "street_address_line_2_billing_address", CHANGED),
+    FieldMap("city_billing_address", "city_billing_address", CHANGED),
+    FieldMap("state_billing_address", "state_billing_address", CHANGED),
+    FieldMap("zip_code_billing_address", "zip_code_billing_address", CHANGED),
+    FieldMap("country_billing_address", "country_billing_address", CHANGED),
+]
+
+# Account Setup and Parent Portal are copied the same way for both organization doctypes
+ACCOUNT_FIELDS = [
+    FieldMap("funfangle_username", "funfangle_username"),
+    FieldMap("funfangle_password", "funfangle_password"),
+    FieldMap("link_to_parent_portal", "link_to_parent_portal"),
+]
+
+# A Camp follows its Onboarding whenever the two differ
+CAMP_FIELDS = [
+    FieldMap("registration_method", "registration_software"),
+    # Tax Info
+    FieldMap("exempt_status", "tax_exempt", DIFFERENT, skip=("Pending",)),
+    FieldMap("tax_exempt_id", "tax_exemption_number", DIFFERENT),
+    FieldMap("first_day_of_camp", "first_day_of_camp"),
+    # Discount/Association
+    FieldMap("custom_discount", "association"),
+    *ADDRESS_FIELDS,
+    # POC Info
+    FieldMap("poc_name", "contact_name"),
+    FieldMap("poc_email", "email"),
+    FieldMap("poc_phone_number", "phone"),
+    *ACCOUNT_FIELDS,
+    # Organization IDs
+    FieldMap("organization_order_id", "organization_order_id"),
+    FieldMap("organization_funfangle_id", "organization_funfangle_id"),
+]
+
+# An Other Organization only takes the Onboarding values that were just edited, so direct edits survive
+OTHER_ORGANIZATION_FIELDS = [
+    # Tax Info
+    FieldMap("exempt_status", "tax_exempt", CHANGED, skip=("Pending",)),
+    FieldMap("tax_exempt_id", "tax_exemption_number", CHANGED_TRUTHY),
+    # Discount/Association
+    FieldMap("custom_discount", "association", CHANGED_TRUTHY),
+    *ADDRESS_FIELDS,
+    # POC Info
+    FieldMap("poc_name", "contact_name", CHANGED_TRUTHY),
+    FieldMap("poc_email", "email", CHANGED_TRUTHY),
+    FieldMap("poc_phone_number", "phone", CHANGED_TRUTHY),
+    # Organization IDs
+    FieldMap("organization_order_id", "organization_order_id", CHANGED_TRUTHY),
+    FieldMap("organization_funfangle_id", "organization_funfangle_id", CHANGED_TRUTHY),
+    *ACCOUNT_FIELDS,
+]
+
+FIELD_MAPS = {
+    "Camp": CAMP_FIELDS,
+    "Other Organization": OTHER_ORGANIZATION_FIELDS,
+}
+
+# Address fields that must be filled in before the address counts as collected; billing is not needed
+# when it is the same as shipping. Camps also need street line 2.
+ADDRESS_PARTS = ("street_address_line_1", "city", "state", "zip_code", "country")
+CAMP_ADDRESS_PARTS = ("street_address_line_1", "street_address_line_2", "city", "state", "zip_code", "country")
+
+
+def _address_collected(parts):
+    def is_complete(doc, target):
+        shipping = all(doc.get(f"{part}_shipping_address") for part in parts)
+        billing = doc.billing_address_same or all(doc.get(f"{part}_billing_address") for part in parts)
+        return bool(shipping and billing)
+
+    return is_complete
+
+
+# Onboarding checkboxes that are ticked once the linked organization holds the required data.
+# Each rule is (onboarding flag, predicate(onboarding, target)); flags are only ever set, never cleared.
+SHARED_FLAGS = [
+    ("custom_set_discount", lambda doc, target: target.association),
+    ("gathered_poc_information", lambda doc, target: target.contact_name and target.email and target.phone),
+    ("account_setup", lambda doc, target: target.funfangle_username and target.funfangle_password),
+    ("set_up_parent_portal", lambda doc, target: target.link_to_parent_portal),
+    ("assigned_organization_order_id", lambda doc, target: target.organization_order_id),
+    ("assigned_organization_funfangle_id", lambda doc, target: target.organization_funfangle_id),
+]
+
+CAMP_FLAGS = [
+    ("registration_identified", lambda doc, target: target.registration_software),
+    ("first_day_of_camp_provided", lambda doc, target: target.first_day_of_camp),
+    ("tax_exempt_id_gathered", lambda doc, target: target.tax_exempt == "Taxed" or (
+        target.tax_exempt == "Exempt" and target.tax_exemption_number)),
+    ("collected_address", _address_collected(CAMP_ADDRESS_PARTS)),
+    *SHARED_FLAGS,
+]
+
+OTHER_ORGANIZATION_FLAGS = [
+    # Any exemption status with a number counts for an Other Organization
+    ("tax_exempt_id_gathered", lambda doc, target: target.tax_exempt == "Taxed" or (
+        target.tax_exempt and target.tax_exemption_number)),
+    ("collected_address", _address_collected(ADDRESS_PARTS)),
+    *SHARED_FLAGS,
+]
+
+COMPLETION_FLAGS = {
+    "Camp": CAMP_FLAGS,
+    "Other Organization": OTHER_ORGANIZATION_FLAGS,
+}
+
+
+def compute_changes(doc, target, original=None):
+    """
+    Works out, in a single pass over the field map, which target fields need a new value.
+    Args:
+        doc: The Onboarding document being saved.
+        target: The linked Camp or Other Organization document.
+        original: The stored Onboarding (needed for the CHANGED modes); None for new documents.
+    Returns:
+        dict: {target fieldname: new value} for every field that actually differs.
+    """
+    changes = {}
+    for field in FIELD_MAPS[target.doctype]:
+        value = doc.get(field.source)
+        if value in field.skip:
+            continue
+        if field.mode in (TRUTHY, CHANGED_TRUTHY) and not value:
+            continue
+        if (
+            field.mode in (CHANGED, CHANGED_TRUTHY)
+            and original is not None
+            and same_value(value, original.get(field.source))
+        ):
+            continue
+        if not same_value(value, target.get(field.target)):
+            changes[field.target] = value
+    return changes
+
+
+def apply_completion_flags(doc, target):
+    """
+    Ticks the Onboarding completion checkboxes whose data is now present on the target.
+    Args:
+        doc: The Onboarding document being saved.
+        target: The linked Camp or Other Organization document (with changes applied).
+    """
+    for flag, is_complete in COMPLETION_FLAGS[target.doctype]:
+        if not doc.get(flag) and is_complete(doc, target):
+            doc.set(flag, 1)
+
+
+def sync_onboarding(doc, target_doctype):
+    """
+    Synchronizes an Onboarding document to its linked Camp or Other Organization.
+    The diff is computed once against the target, applied, and the target is only saved if something
+    actually changed, so unchanged Onboarding saves no longer re-run the whole organization hook chain.
+    Args:
+        doc: The Onboarding document being saved.
+        target_doctype: "Camp" or "Other Organization".
+    Returns:
+        dict: The changes written to the target (empty if none).
+    Raises:
+        frappe.DoesNotExistError: If the linked organization does not exist.
+    """
+    target = frappe.get_doc(target_doctype, doc.title)
+    changes = compute_changes(doc, target, get_original(doc))
+    if changes:
+        target.update(changes)
+        cascade.save(target, changes)  # Save only when the Onboarding actually changed something
+    apply_completion_flags(doc, target)
+    return changes
@@ -1,59 +1,167 @@
 
+
 # Import Frappe framework for ERPNext operations and database access
 import frappe
 
+# Per-request cascade coordinator (re-entrancy guard, coalesced writes, cascade tree)
+from camp_manager import cascade
+
+# Change log entries for the flag UPDATE
+from camp_manager.change_log import record_updates
+
+# Fuzzy match against existing organizations, for the near-duplicate warning
+from camp_manager.duplicates import find_duplicates
+
+# Joined organization -> Customer / Onboarding lookup
+from camp_manager.identity import resolve_many
+
+# Wall time / query counters for the doc_event handlers (see get_hook_stats)
+from camp_manager.instrumentation import instrument
+
+# App logger for creation audit messages
+from camp_manager.logger import get_logger
+
+log = get_logger("organization_hooks")
 
+# Customer field linking back to each organization doctype
+CUSTOMER_LINK_FIELDS = {
+    "Camp": "custom_camp_link",
+    "Other Organization": "custom_other_organization_link",
+}
+
+
+@instrument
+@cascade.cascade_hook
 def organization_creation(doc, method):
     """
     Creates Customer and Onboarding records for a Camp or Other Organization document if they do not already exist.
     This function is triggered on document update events and ensures that every organization has a corresponding Customer
     and Onboarding record in ERPNext, which is essential for downstream processes like billing, onboarding workflows, and reporting.
+    A new organization whose name is close to an existing one (see duplicates.find_duplicates) gets a warning; it is still created.
     Args:
         doc: The Frappe document being processed (Camp or Other Organization).
         method: The method triggering the hook (e.g., on_update).
     """
-    # Only proceed if customer_and_onboarding_created flag is not set
-    if not doc.customer_and_onboarding_created:
-        try:
-            customer = None  # Will hold the new Customer document if created
-            # If the document is a Camp, create a Customer if one does not exist
-            if doc.doctype == "Camp":
-                # Check if a Customer with this organization_name already exists
-                if not frappe.db.exists("Customer", {"customer_name": doc.organization_name}):
-                    frappe.logger().info(f"Creating Customer for {doc.organization_name}")  # Log creation for audit
-                    customer = frappe.new_doc("Customer")  # Create new Customer document
-                    customer.customer_name = doc.organization_name  # Set customer name from organization
-                    customer.lead_name = doc.lead_link  # Link to lead if available
-                    customer.custom_camp_link = doc.organization_name  # Custom field for camp linkage
-                    customer.customer_type = "Company"  # Set type to Company
-                    customer.save(ignore_permissions=True)  # Save Customer, bypassing permissions
-                    frappe.msgprint(f"Customer {customer.name} created")  # Notify user in UI
-            # If the document is an Other Organization, create a Customer if one does not exist
-            elif doc.doctype == "Other Organization":
-                if not frappe.db.exists("Customer", {"customer_name": doc.organization_name}):
-                    frappe.logger().info(f"Creating Customer for {doc.organization_name}")  # Log creation for audit
-                    customer = frappe.new_doc("Customer")  # Create new Customer document
-                    customer.customer_name = doc.organization_name  # Set customer name from organization
-                    customer.lead_name = doc.lead_link  # Link to lead if available
-                    customer.custom_other_organization_link = doc.organization_name  # Custom field for org linkage
-                    customer.customer_type = "Company"  # Set type to Company
-                    customer.save(ignore_permissions=True)  # Save Customer, bypassing permissions
-                    frappe.msgprint(f"Customer {customer.name} created")  # Notify user in UI
-            # Create Onboarding document if one does not exist for this organization
-            if not frappe.db.exists("Onboarding", {"title": doc.organization_name}):
-                onboarding = frappe.new_doc("Onboarding")  # Create new Onboarding document
-                onboarding.name = doc.organization_name  # Set onboarding name
-                onboarding.title = doc.organization_name  # Set onboarding title
-                onboarding.organization_type = doc.doctype  # Set type (Camp or Other Organization)
-                onboarding.custom_customer_link = customer.name if customer else None  # Link to Customer if created
-                # For non-Camp organizations, mark onboarding steps as completed
-                if doc.doctype != "Camp":
-                    onboarding.registration_identified = 1  # Mark registration as identified
-                    onboarding.first_day_of_camp_provided = 1  # Mark first day as provided
-                onboarding.save(ignore_permissions=True)  # Save Onboarding, bypassing permissions
-                # Set flag on original document to prevent duplicate creation
-                frappe.db.set_value(doc.doctype, doc.organization_name, "customer_and_onboarding_created", 1)
-                frappe.msgprint(f"Onboarding document for {onboarding.name} created")  # Notify user in UI
-        except Exception as e:
-            # If any error occurs, notify user for troubleshooting
-            frappe.msgprint(f"Failed to create Customer and Onboarding due to: {str(e)}")
\ No newline at end of file
+    # Only proceed if customer_and_onboarding_created flag is not set (no database access otherwise)
+    if doc.customer_and_onboarding_created:
+        return
+    if doc.flags.in_insert:
+        _warn_duplicates(doc)
+    try:
+        _provision(doc.doctype, [doc])
+        doc.customer_and_onboarding_created = 1
+    except Exception as e:
+        # If any error occurs, notify user for troubleshooting
+        frappe.msgprint(f"Failed to create Customer and Onboarding due to: {str(e)}")
+
+
+def provision_organizations(doctype, names):
+    """
+    Creates the missing Customer and Onboarding records for many organizations at once (e.g. data migrations).
+    The organizations are read with one query, the missing Customers and Onboardings are found with one
+    set-based query each, and everything is created in the current transaction, Customers first.
+    The customer_and_onboarding_created flag is then set with one UPDATE and a single summary message is shown.
+    Args:
+        doctype: "Camp" or "Other Organization".
+        names: Names of the organizations to provision.
+    Returns:
+        dict: {"customers": [...], "onboardings": [...]} names of the created records.
+    """
+    if doctype not in CUSTOMER_LINK_FIELDS:
+        frappe.throw(f"Cannot provision organizations of type {doctype}")
+    if not names:
+        return {"customers": [], "onboardings": []}
+    orgs = frappe.get_all(
+        doctype,
+        filters={"name": ["in", list(names)], "customer_and_onboarding_created": 0},
+        fields=["name", "organization_name", "lead_link"],
+    )
+    return _provision(doctype, orgs)
+
+
+def _provision(doctype, orgs):
+    created = {"customers": [], "onboardings": []}
+    if not orgs:
+        return created
+
+    # One joined lookup finds the existing Customers and Onboardings of every organization. Everything below
+    # is keyed by the organization's name (what the lookup joins on), not its organization_name field.
+    identities = resolve_many(doctype, [org.name for org in orgs])
+    # A Customer of the same name counts as existing, so it is not created twice
+    customers = {
+        identity.name: identity.customer or identity.named_customer
+        for identity in identities.values()
+        if identity.customer or identity.named_customer
+    }
+    onboardings = {identity.name for identity in identities.values() if identity.onboarding}
+
+    # Batch 1: Customers
+    link_field = CUSTOMER_LINK_FIELDS[doctype]
+    for org in orgs:
+        if org.name in customers:
+            continue
+        log.info("Creating Customer for %s", org.name)  # Log creation for audit
+        customer = frappe.new_doc("Customer")  # Create new Customer document
+        customer.customer_name = org.organization_name  # Set customer name from organization
+        customer.lead_name = org.lead_link  # Link to lead if available
+        customer.set(link_field, org.name)  # Custom field for camp / organization linkage
+        customer.customer_type = "Company"  # Set type to Company
+        customer.insert(ignore_permissions=True)  # Save Customer, bypassing permissions
+        customers[org.name] = customer.name
+        created["customers"].append(customer.name)
+
+    # Batch 2: Onboardings
+    for org in orgs:
+        if org.name in onboardings:
+            continue
+        onboarding = frappe.new_doc("Onboarding")  # Create new Onboarding document
+        onboarding.name = org.name  # Set onboarding name
+        onboarding.title = org.name  # Set onboarding title
+        onboarding.organization_type = doctype  # Set type (Camp or Other Organization)
+        onboarding.custom_customer_link = customers.get(org.name)  # Link to the Customer
+        # For non-Camp organizations, mark onboarding steps as completed
+        if doctype != "Camp":
+            onboarding.registration_identified = 1  # Mark registration as identified
+            onboarding.first_day_of_camp_provided = 1  # Mark first day as provided
+        onboarding.insert(ignore_permissions=True)  # Save Onboarding, bypassing permissions
+        onboardings.add(org.name)
+        created["onboardings"].append(onboarding.name)
+
+    # Set flag on the organizations to prevent duplicate creation. Organizations being saved further up
+    # the cascade get a coalesced write; the rest are flagged with one UPDATE.
+    flag_now = []
+    for org in orgs:
+        if cascade.in_progress(doctype, org.name):
+            cascade.set_value(doctype, org.name, {"customer_and_onboarding_created": 1})
+        else:
+            flag_now.append(org.name)
+    if flag_now:
+        table = frappe.qb.DocType(doctype)
+        (
+            frappe.qb.update(table)
+            .set(table.customer_and_onboarding_created, 1)
+            .where(table.name.isin(flag_now))
+        ).run()
+        record_updates(doctype, flag_now, ["customer_and_onboarding_created"])
+
+    _notify(created)
+    return created
+
+
+def _warn_duplicates(doc):
+    matches = find_duplicates(doc.as_dict(), exclude=(doc.doctype, doc.name))
+    if matches:
+        listed = ", ".join(f"{match.doctype} {match.name}" for match in matches[:5])
+        frappe.msgprint(f"{doc.organization_name} may be a duplicate of: {listed}", indicator="orange")
+
+
+def _notify(created):
+    # One message for the whole batch instead of one per record
+    parts = []
+    for label, names in (("Customer", created["customers"]), ("Onboarding document", created["onboardings"])):
+        if len(names) == 1:
+            parts.append(f"{label} {names[0]} created")
+        elif names:
+            parts.append(f"{len(names)} {label}s created")
+    if parts:
+        frappe.msgprint("<br>".join(parts))  # Notify user in UI
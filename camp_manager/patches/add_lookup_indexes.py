@@ -0,0 +1,10 @@
+# Index registry shared with the audit command
+from camp_manager.indexes import ensure_indexes
+
+
+def execute():
+    """
+    Adds the database indexes behind the app's hook lookups (Customer links and names, organization names,
+    Onboarding titles, ...) on sites where they are missing.
+    """
+    ensure_indexes()
@@ -0,0 +1,10 @@
+# Blocking key builder shared with the organization hooks
+from camp_manager.duplicates import rebuild_blocking_keys
+
+
+def execute():
+    """
+    Fills the Organization Blocking Key table from the existing Camps and Other Organizations, so duplicate
+    detection covers organizations created before it was introduced.
+    """
+    rebuild_blocking_keys()
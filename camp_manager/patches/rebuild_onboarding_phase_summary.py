@@ -0,0 +1,20 @@
+# Import Frappe for ERPNext document and database operations
+import frappe
+
+# Recount helper shared with the daily scheduled job
+from camp_manager.onboarding_pipeline import refresh_phase_summary
+
+
+def execute():
+    """
+    Seeds the Onboarding Phase Summary for existing sites.
+    Onboardings created before phase tracking get their last modification time as phase_since,
+    then the per-phase counts are built once from the Onboarding table.
+    """
+    onboarding = frappe.qb.DocType("Onboarding")
+    (
+        frappe.qb.update(onboarding)
+        .set(onboarding.phase_since, onboarding.modified)
+        .where(onboarding.phase_since.isnull())
+    ).run()
+    refresh_phase_summary()
@@ -0,0 +1,192 @@
+# Frappe is used for account lookups/creation and for the Redis cache
+import frappe
+
+# App logger for account creation messages
+from camp_manager.logger import get_logger
+
+log = get_logger("receivables")
+
+# Redis hashes (frappe.cache prefixes them per site)
+COMPANY_CACHE_KEY = "camp_manager:default_company"
+PARENT_CACHE_KEY = "camp_manager:receivable_parent"  # company -> Accounts Receivable group account
+ACCOUNT_CACHE_KEY = "camp_manager:debtors_accounts"  # "company::currency" -> Debtors <CUR> account
+
+# Name of the per-currency receivable accounts created under Accounts Receivable
+DEBTORS_ACCOUNT_PREFIX = "Debtors"
+
+
+def debtors_account_name(currency):
+    """Returns the account_name used for a currency's receivable account (e.g. 'Debtors CAD')."""
+    return f"{DEBTORS_ACCOUNT_PREFIX} {currency}"
+
+
+def get_default_company():
+    """
+    Returns the company the app books customers against (the first Company), cached in Redis.
+    Returns:
+        str: Company name, or None if no company exists yet.
+    """
+    company = frappe.cache.get_value(COMPANY_CACHE_KEY)
+    if company is None:
+        first_company = frappe.get_all("Company", fields=["name"], limit=1)
+        company = first_company[0]["name"] if first_company else None
+        if company:
+            frappe.cache.set_value(COMPANY_CACHE_KEY, company)
+    return company
+
+
+def get_receivable_parent(company):
+    """
+    Returns the Accounts Receivable group account of a company, cached in Redis.
+    Args:
+        company: Company name.
+    Returns:
+        str: Account name (e.g. 'Accounts Receivable - FF'), or None if it does not exist.
+    """
+    parent = frappe.cache.hget(PARENT_CACHE_KEY, company)
+    if parent is None:
+        parent = frappe.db.get_value(
+            "Account", {"account_name": "Accounts Receivable", "company": company, "is_group": 1}, "name"
+        )
+        if parent:
+            frappe.cache.hset(PARENT_CACHE_KEY, company, parent)
+    return parent
+
+
+def ensure_currency_enabled(currency):
+    """
+    Enables a Currency if it is disabled, so it can be used on customers and accounts.
+    Args:
+        currency: Currency code (e.g. 'CAD').
+    """
+    if not frappe.get_cached_value("Currency", currency, "enabled"):
+        currency_doc = frappe.get_doc("Currency", currency)
+        currency_doc.enabled = 1  # Enable currency if disabled
+        currency_doc.save(ignore_permissions=True)
+
+
+def ensure_debtors_account(currency, company=None):
+    """
+    Ensures a 'Debtors <CUR>' child account exists under Accounts Receivable for the given currency and company.
+    Accounts known to exist are memoized in Redis, so a repeat call costs no database query. Newly created
+    accounts are only memoized once the transaction commits.
+    Args:
+        currency: Currency for the account (e.g. 'USD').
+        company: Company name; defaults to get_default_company().
+    Returns:
+        The name of the existing or newly created account.
+    Raises:
+        ValueError: If the company has no Accounts Receivable group account.
+    """
+    company = company or get_default_company()
+    key = f"{company}::{currency}"
+    account = frappe.cache.hget(ACCOUNT_CACHE_KEY, key)
+    if account:
+        return account
+
+    parent_account = get_receivable_parent(company)
+    # If parent account not found, raise error to prevent orphaned accounts
+    if not parent_account:
+        raise ValueError(f"Accounts Receivable parent not found for company '{company}'")
+
+    account_name = debtors_account_name(currency)
+    account = frappe.db.exists("Account", {
+        "account_name": account_name,
+        "parent_account": parent_account,
+        "company": company,
+    })
+    if account:
+        frappe.cache.hset(ACCOUNT_CACHE_KEY, key, account)
+        return account
+
+    account = _create_debtors_account(account_name, currency, parent_account, company)
+    frappe.db.after_commit.add(lambda: frappe.cache.hset(ACCOUNT_CACHE_KEY, key, account))
+    return account
+
+
+def clear_account_cache(doc=None, method=None):
+    """
+    Hook (Account / Company changes): drops the cached company, receivable parents and Debtors accounts.
+    Args:
+        doc: The Account or Company document that changed (unused).
+        method: The method triggering the hook (unused).
+    """
+    frappe.cache.delete_value([COMPANY_CACHE_KEY, PARENT_CACHE_KEY, ACCOUNT_CACHE_KEY])
+
+
+@frappe.whitelist()
+def enqueue_account_provisioning():
+    """Queues provision_currency_accounts as a background job (one at a time)."""
+    frappe.only_for(["System Manager", "Accounts Manager"])
+    frappe.enqueue(
+        provision_currency_accounts,
+        queue="long",
+        job_id="camp_manager::provision_currency_accounts",
+        deduplicate=True,
+    )
+
+
+def provision_currency_accounts(company=None):
+    """
+    Creates, in one pass, every 'Debtors <CUR>' account needed by organizations and customers.
+    The needed currencies come from one DISTINCT query per doctype, the existing accounts from one query,
+    and only the missing accounts are inserted.
+    Args:
+        company: Company name; defaults to get_default_company().
+    Returns:
+        list[str]: Names of the accounts that were created.
+    """
+    company = company or get_default_company()
+    parent_account = get_receivable_parent(company)
+    if not parent_account:
+        raise ValueError(f"Accounts Receivable parent not found for company '{company}'")
+
+    currencies = set()
+    for doctype, fieldname in (("Camp", "currency"), ("Other Organization", "currency"),
+                               ("Customer", "default_currency")):
+        currencies.update(frappe.get_all(doctype, fields=[fieldname], distinct=True, pluck=fieldname))
+    currencies.discard(None)
+    currencies.discard("")
+    if not currencies:
+        return []
+
+    existing = {
+        row.account_name
+        for row in frappe.get_all(
+            "Account",
+            filters={
+                "parent_account": parent_account,
+                "company": company,
+                "account_name": ["in", [debtors_account_name(currency) for currency in currencies]],
+            },
+            fields=["account_name"],
+        )
+    }
+
+    created = []
+    for currency in sorted(currencies):
+        account_name = debtors_account_name(currency)
+        if account_name in existing:
+            continue
+        ensure_currency_enabled(currency)
+        created.append(_create_debtors_account(account_name, currency, parent_account, company))
+    frappe.db.commit()
+    clear_account_cache()
+    return created
+
+
+def _create_debtors_account(account_name, currency, parent_account, company):
+    # Create the account with correct type and currency
+    account = frappe.get_doc({
+        "doctype": "Account",
+        "account_name": account_name,
+        "parent_account": parent_account,
+        "is_group": 0,
+        "root_type": "Asset",
+        "account_type": "Receivable",
+        "account_currency": currency,
+        "company": company,
+    })
+    account.insert(ignore_permissions=True)  # Insert new account into database
+    log.info("Created receivable account %s under %s", account.name, parent_account)
+    return account.name
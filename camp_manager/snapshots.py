@@ -0,0 +1,108 @@
+# Frappe is used for document loading and for the request-local storage of snapshots
+import frappe
+
+# Standard columns (name, modified, owner, ...) are never reported as changed fields
+from frappe.model import default_fields
+
+
+def get_original(doc):
+    """
+    Returns the stored version of a document, as it was before the current save.
+    Every hook in the save pipeline should use this instead of frappe.get_doc(doc.doctype, doc.name),
+    so the previous row is loaded at most once per document per transaction.
+    Frappe already loads the previous version at the start of save() (doc.get_doc_before_save()), so that
+    copy is reused whenever it is available. Outside of a save, the stored row is loaded once and kept for
+    the rest of the transaction.
+    Args:
+        doc: The Frappe document being processed.
+    Returns:
+        The stored Document, or None if the document is new.
+    """
+    if doc.is_new():
+        return None
+
+    # Inside save() Frappe has already fetched the previous version for us
+    before_save = doc.get_doc_before_save()
+    if before_save is not None:
+        return before_save
+
+    store = _get_store()
+    key = (doc.doctype, doc.name)
+    if key not in store:
+        store[key] = frappe.get_doc(doc.doctype, doc.name)
+    return store[key]
+
+
+def changed_fields(doc):
+    """
+    Returns the set of fieldnames whose value differs from the stored version of the document.
+    Only data columns are compared; child tables and standard columns (modified, owner, ...) are ignored.
+    For new documents every field that has a value counts as changed.
+    Args:
+        doc: The Frappe document being processed.
+    Returns:
+        set: Names of the changed fields.
+    """
+    fieldnames = _data_fieldnames(doc)
+    original = get_original(doc)
+    if original is None:
+        return {fieldname for fieldname in fieldnames if doc.get(fieldname) not in (None, "")}
+    return {
+        fieldname for fieldname in fieldnames
+        if _comparable(doc.get(fieldname)) != _comparable(original.get(fieldname))
+    }
+
+
+def has_changed(doc, *fieldnames):
+    """
+    Checks whether any of the given fields changed since the stored version of the document.
+    Cheaper than changed_fields when a hook only cares about one or two fields.
+    Args:
+        doc: The Frappe document being processed.
+        *fieldnames: The fields to check.
+    Returns:
+        bool: True if the document is new or any of the fields changed.
+    """
+    original = get_original(doc)
+    if original is None:
+        return True
+    return any(_comparable(doc.get(f)) != _comparable(original.get(f)) for f in fieldnames)
+
+
+def same_value(a, b):
+    """
+    Compares two field values the way changed_fields does, so a database value and a form value
+    of the same data (e.g. a date and its "YYYY-MM-DD" string) are treated as equal.
+    """
+    return _comparable(a) == _comparable(b)
+
+
+def clear():
+    """Drops all snapshots held for the current transaction."""
+    frappe.local.camp_manager_snapshots = None
+
+
+def _get_store():
+    # Snapshots live on frappe.local so they never leak between requests or sites, and are
+    # dropped at the end of each transaction so a later transaction sees fresh rows
+    store = getattr(frappe.local, "camp_manager_snapshots", None)
+    if store is None:
+        store = frappe.local.camp_manager_snapshots = {}
+        frappe.db.after_commit.add(clear)
+        frappe.db.after_rollback.add(clear)
+    return store
+
+
+def _data_fieldnames(doc):
+    # get_valid_columns() is cached on the meta object, so this does not hit the database
+    return [f for f in doc.meta.get_valid_columns() if f not in default_fields]
+
+
+def _comparable(value):
+    # Values loaded from the database and values set from a form differ in type
+    # (date vs "2025-06-01", 1 vs "1", 10 vs 10.0, None vs ""), so compare their string forms
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
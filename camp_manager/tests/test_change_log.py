@@ -0,0 +1,52 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from camp_manager.change_log import CHANGE_LOG_DOCTYPE, GAP_TIMEOUT_SECONDS, changes_since
+
+
+class TestChangesSince(IntegrationTestCase):
+	"""
+	Sequence numbers are written with explicit names to simulate a transaction that commits a lower
+	number after a higher one.
+	"""
+
+	def setUp(self):
+		self.cursor = frappe.db.sql(f"select coalesce(max(name), 0) from `tab{CHANGE_LOG_DOCTYPE}`")[0][0]
+
+	def write(self, seq, timestamp=None):
+		timestamp = timestamp or now_datetime()
+		frappe.db.bulk_insert(
+			CHANGE_LOG_DOCTYPE,
+			["name", "owner", "modified_by", "creation", "modified", "ref_doctype", "ref_name", "operation",
+			 "changed_fields", "timestamp"],
+			[[seq, "Administrator", "Administrator", timestamp, timestamp, "Camp", f"Late Camp {seq}", "Update",
+			  "[]", timestamp]],
+		)
+
+	def test_late_commit_of_a_lower_seq_is_delivered(self):
+		low, high = self.cursor + 1, self.cursor + 2
+		self.write(high)  # Committed first
+
+		page = changes_since(self.cursor)
+		self.assertEqual(page["changes"], [])
+		self.assertEqual(page["next_seq"], self.cursor)
+		self.assertEqual(page["waiting_for"], low)
+
+		self.write(low)  # The long transaction commits afterwards
+
+		page = changes_since(page["next_seq"])
+		self.assertEqual([change["seq"] for change in page["changes"]], [low, high])
+		self.assertEqual(page["next_seq"], high)
+		self.assertIsNone(page["waiting_for"])
+
+	def test_gap_that_never_closes_ages_out(self):
+		stale = add_to_date(now_datetime(), seconds=-GAP_TIMEOUT_SECONDS - 60)
+		self.write(self.cursor + 2, stale)  # cursor + 1 was rolled back
+
+		page = changes_since(self.cursor)
+		self.assertEqual([change["seq"] for change in page["changes"]], [self.cursor + 2])
+		self.assertIsNone(page["waiting_for"])
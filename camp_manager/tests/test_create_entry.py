@@ -0,0 +1,25 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from camp_manager.api.create_entry import bulk_insert_camp_settings
+
+
+class TestBulkInsertCampSettings(IntegrationTestCase):
+	def row(self, camp_name):
+		return {"camp_name": camp_name, "first_day_of_camp": "2026-06-01", "num_campers": 80}
+
+	def test_name_taken_concurrently_is_reported_per_row(self):
+		taken = f"Bulk Camp {frappe.generate_hash(length=6)}"
+		new = f"Bulk Camp {frappe.generate_hash(length=6)}"
+		# Inserted by another submission after the batch checked which names exist
+		frappe.get_doc({"doctype": "Camp Settings", **self.row(taken)}).insert(ignore_permissions=True)
+
+		result = bulk_insert_camp_settings([self.row(taken), self.row(new)])
+
+		self.assertEqual(result.inserted, [new])
+		self.assertEqual(result.existing, [taken])
+		self.assertEqual(result.errors, {})
+		self.assertTrue(frappe.db.exists("Camp Settings", new))
@@ -0,0 +1,77 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from camp_manager import identity
+from camp_manager.api.create_entry import create_from_google_form_batch
+from camp_manager.api.tokens import clear_token_cache
+
+
+class TestIdentityCache(IntegrationTestCase):
+	"""
+	The cached identity must follow writes that skip the document hooks.
+	The batch endpoint commits, so the records are deleted again in tearDown.
+	"""
+
+	def setUp(self):
+		self.name = f"Identity Camp {frappe.generate_hash(length=6)}"
+		camp = frappe.new_doc("Camp")
+		camp.organization_name = self.name
+		camp.email = "identity@example.com"
+		camp.country_shipping_address = "United States"
+		camp.insert(ignore_permissions=True)
+
+		# A temporary rotation token lets the test call the webhook
+		self.token = frappe.generate_hash(length=32)
+		self.previous = frappe.db.get_single_value("Google Form Sync Settings", "previous_secret_tokens") or ""
+		frappe.db.set_single_value(
+			"Google Form Sync Settings", "previous_secret_tokens", f"{self.previous}\n{self.token}".strip()
+		)
+		frappe.db.commit()
+		clear_token_cache()
+
+	def tearDown(self):
+		frappe.db.set_single_value("Google Form Sync Settings", "previous_secret_tokens", self.previous)
+		customers = frappe.get_all("Customer", filters={"custom_camp_link": self.name}, pluck="name")
+		if customers:
+			frappe.db.delete("Customer", {"name": ["in", customers]})
+		for doctype in ("Camp Settings", "Onboarding", "Camp"):
+			frappe.db.delete(doctype, {"name": self.name})
+		for doctype in ("Organization Change Log", "Organization Blocking Key"):
+			frappe.db.delete(doctype, {"ref_name": self.name})
+		frappe.db.commit()
+		clear_token_cache()
+		identity.clear([self.name])
+
+	def test_batch_insert_refreshes_cached_identity(self):
+		self.assertIsNone(identity.resolve("Camp", self.name).camp_settings)  # Cached without settings
+
+		frappe.local.form_dict = frappe._dict(
+			secret_token=self.token,
+			submissions=[{"camp_name": self.name, "first_day_of_camp": "2026-06-01", "num_campers": "80"}],
+		)
+		response = create_from_google_form_batch()
+		self.assertEqual(response["results"][0]["status"], "success")
+
+		self.assertEqual(identity.resolve("Camp", self.name).camp_settings, self.name)
+
+	def test_hook_clears_identity_cached_before_commit(self):
+		cached = identity.resolve("Camp", self.name)
+		self.assertEqual(cached.onboarding, self.name)
+
+		frappe.delete_doc("Onboarding", self.name, ignore_permissions=True)
+		# A concurrent request that still reads the committed row caches the old identity again
+		frappe.cache.hset(identity.IDENTITY_CACHE_KEY, f"Camp::{self.name}", dict(cached))
+		frappe.db.commit()
+
+		self.assertIsNone(identity.resolve("Camp", self.name).onboarding)
+
+	def test_hook_clears_identity_cached_before_rollback(self):
+		frappe.delete_doc("Onboarding", self.name, ignore_permissions=True)
+		self.assertIsNone(identity.resolve("Camp", self.name).onboarding)  # Cached inside the transaction
+
+		frappe.db.rollback()
+
+		self.assertEqual(identity.resolve("Camp", self.name).onboarding, self.name)
@@ -0,0 +1,26 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from camp_manager.onboarding_pipeline import SUMMARY_DOCTYPE, _adjust_phase, _ensure_phase_row
+
+
+class TestPhaseSummaryRow(IntegrationTestCase):
+	def setUp(self):
+		frappe.local.flags.pop("camp_manager_summary_phases", None)
+
+	def test_row_created_concurrently_is_updated(self):
+		phase = "1"
+		_ensure_phase_row(phase)
+		frappe.local.flags.pop("camp_manager_summary_phases", None)
+		count = frappe.db.get_value(SUMMARY_DOCTYPE, phase, "onboarding_count")
+
+		# Another save created the row after this one checked for it
+		with patch("frappe.db.exists", return_value=False):
+			_adjust_phase(phase, count=1)
+
+		self.assertEqual(frappe.db.get_value(SUMMARY_DOCTYPE, phase, "onboarding_count"), count + 1)
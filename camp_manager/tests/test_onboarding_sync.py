@@ -0,0 +1,69 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from camp_manager.onboarding_sync import apply_completion_flags, compute_changes
+
+ADDRESS = {
+	"street_address_line_1_shipping_address": "1 Main St",
+	"city_shipping_address": "Springfield",
+	"state_shipping_address": "IL",
+	"zip_code_shipping_address": "62701",
+	"country_shipping_address": "United States",
+	"billing_address_same": 1,
+}
+
+
+class TestOnboardingSync(IntegrationTestCase):
+	def test_camp_follows_onboarding_when_different(self):
+		doc = frappe._dict(poc_name="Pat", exempt_status="", tax_exempt_id="")
+		original = frappe._dict(doc)
+		target = frappe._dict(doctype="Camp", contact_name="Sam", tax_exempt="Taxed", tax_exemption_number="123")
+
+		changes = compute_changes(doc, target, original)
+
+		self.assertEqual(changes["contact_name"], "Pat")
+		# Empty tax values are copied even though the Onboarding did not change
+		self.assertEqual(changes["tax_exempt"], "")
+		self.assertEqual(changes["tax_exemption_number"], "")
+
+	def test_other_organization_only_takes_edited_values(self):
+		original = frappe._dict(poc_name="Pat", poc_email="pat@example.com", tax_exempt_id="123")
+		doc = frappe._dict(original, poc_email="new@example.com", tax_exempt_id="")
+		target = frappe._dict(
+			doctype="Other Organization", contact_name="Sam", email="sam@example.com", tax_exemption_number="123"
+		)
+
+		changes = compute_changes(doc, target, original)
+
+		# Unchanged and cleared values leave the Other Organization alone
+		self.assertEqual(changes, {"email": "new@example.com"})
+
+	def test_pending_exempt_status_is_never_copied(self):
+		original = frappe._dict(exempt_status="Exempt")
+		doc = frappe._dict(exempt_status="Pending")
+		for doctype in ("Camp", "Other Organization"):
+			target = frappe._dict(doctype=doctype, tax_exempt="Exempt")
+			self.assertNotIn("tax_exempt", compute_changes(doc, target, original))
+
+	def test_camp_address_needs_street_line_2(self):
+		target = frappe._dict(doctype="Camp")
+		doc = frappe.get_doc({"doctype": "Onboarding", **ADDRESS})
+		apply_completion_flags(doc, target)
+		self.assertFalse(doc.collected_address)
+
+		doc.street_address_line_2_shipping_address = "Suite 2"
+		apply_completion_flags(doc, target)
+		self.assertTrue(doc.collected_address)
+
+	def test_other_organization_address_and_tax_flags(self):
+		target = frappe._dict(doctype="Other Organization", tax_exempt="Non-Profit", tax_exemption_number="123")
+		doc = frappe.get_doc({"doctype": "Onboarding", **ADDRESS})
+
+		apply_completion_flags(doc, target)
+
+		self.assertTrue(doc.collected_address)
+		# Any exemption status with a number counts, not only "Exempt"
+		self.assertTrue(doc.tax_exempt_id_gathered)
@@ -0,0 +1,27 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from frappe.tests import IntegrationTestCase
+
+from camp_manager.api.payload_mapper import PayloadMapper
+
+
+class TestPayloadMapper(IntegrationTestCase):
+	"""Bad values become per-field errors; they never raise out of map()."""
+
+	def setUp(self):
+		# DocField has an Int (length), a Check (reqd) and a Data (label) field on every site
+		self.mapper = PayloadMapper("DocField", ("length", "reqd", "label"))
+
+	def test_non_finite_numbers_are_field_errors(self):
+		for value in ("inf", "-inf", "Infinity", "nan", "1e400"):
+			mapped = self.mapper.map({"length": value})
+			self.assertIsNone(mapped.values["length"], value)
+			self.assertEqual(len(mapped.errors), 1, value)
+			self.assertIn("length", mapped.errors[0])
+
+	def test_valid_values_are_coerced(self):
+		mapped = self.mapper.map({"length": "1,200", "reqd": "Yes", "label": " Camp ", "extra": "x"})
+		self.assertEqual(mapped.values, {"length": 1200, "reqd": 1, "label": "Camp"})
+		self.assertEqual(mapped.errors, [])
+		self.assertEqual(mapped.unknown, ["extra"])
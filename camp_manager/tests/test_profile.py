@@ -0,0 +1,52 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from camp_manager.api.profile import get_organization_profiles
+
+
+class TestOrganizationProfiles(IntegrationTestCase):
+	def setUp(self):
+		self.name = f"Profile Camp {frappe.generate_hash(length=6)}"
+		camp = frappe.new_doc("Camp")
+		camp.organization_name = self.name
+		camp.email = "profile@example.com"
+		camp.country_shipping_address = "United States"
+		camp.insert(ignore_permissions=True)
+
+	def test_response_carries_etag_header(self):
+		response = get_organization_profiles([self.name])
+		self.assertEqual(response.status_code, 200)
+
+		etag = response.headers.get("ETag")
+		self.assertTrue(etag)
+		body = json.loads(response.get_data())["message"]
+		self.assertEqual(etag, f'"{body["etag"]}"')
+		self.assertIn(self.name, body["profiles"])
+
+	def test_matching_if_none_match_returns_304(self):
+		etag = get_organization_profiles([self.name]).headers["ETag"]
+
+		# The sections are not read for a 304
+		with (
+			patch("frappe.get_request_header", return_value=etag),
+			patch("camp_manager.api.profile._fetch", side_effect=AssertionError("sections read")),
+		):
+			response = get_organization_profiles([self.name])
+		self.assertEqual(response.status_code, 304)
+		self.assertEqual(response.headers["ETag"], etag)
+		self.assertFalse(response.get_data())
+
+	def test_etag_changes_when_a_section_changes(self):
+		etag = get_organization_profiles([self.name]).headers["ETag"]
+
+		camp = frappe.get_doc("Camp", self.name)
+		camp.phone = "555-0199"
+		camp.save(ignore_permissions=True)
+
+		self.assertNotEqual(get_organization_profiles([self.name]).headers["ETag"], etag)
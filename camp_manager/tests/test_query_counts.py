@@ -0,0 +1,91 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from camp_manager import snapshots
+from camp_manager.duplicates import find_duplicates_many
+from camp_manager.lead_hooks import convert_lead_to_camp_and_customer, convert_leads
+from camp_manager.onboarding_hooks import manage_onboarding
+from camp_manager.organization_hooks import organization_creation
+from camp_manager.tests.utils import QueryBudget
+from camp_manager.utils import customer_sync_values, organization_hooks
+
+
+class TestHookQueryCounts(IntegrationTestCase):
+	"""
+	Query budgets for the hook entry points.
+	Each test saves nothing new and measures one hook on an organization that is already in sync,
+	so any extra get_doc / exists call added to a hook shows up as a failure.
+	"""
+
+	def setUp(self):
+		self.name = f"Query Budget Camp {frappe.generate_hash(length=6)}"
+		camp = frappe.new_doc("Camp")
+		camp.organization_name = self.name
+		camp.email = "budget@example.com"
+		camp.phone = "555-0100"
+		camp.country_shipping_address = "United States"
+		camp.insert(ignore_permissions=True)  # Creates the Customer and Onboarding
+
+		# Bring the Customer in line with the Camp, so the sync has nothing to write
+		camp.reload()
+		customer = frappe.db.get_value("Customer", {"custom_camp_link": self.name})
+		frappe.db.set_value(
+			"Customer", customer, {**customer_sync_values(camp), "default_currency": camp.currency}
+		)
+		snapshots.clear()
+
+	def test_organization_hooks(self):
+		camp = frappe.get_doc("Camp", self.name)
+		with QueryBudget(max_queries=8, max_docs=1, max_writes=0, label="utils.organization_hooks"):
+			organization_hooks(camp, "before_save")
+
+	def test_organization_creation_short_circuits(self):
+		camp = frappe.get_doc("Camp", self.name)
+		self.assertTrue(camp.customer_and_onboarding_created)
+		with QueryBudget(max_queries=0, max_docs=0, label="organization_hooks.organization_creation"):
+			organization_creation(camp, "on_update")
+
+	def test_organization_creation_existing_records(self):
+		camp = frappe.get_doc("Camp", self.name)
+		camp.customer_and_onboarding_created = 0
+		# One joined lookup for the Customer and Onboarding, the flag UPDATE and its change log entry
+		with QueryBudget(max_queries=3, max_docs=0, max_writes=2, label="organization_hooks.organization_creation"):
+			organization_creation(camp, "on_update")
+
+	def test_manage_onboarding(self):
+		onboarding = frappe.get_doc("Onboarding", self.name)
+		# The stored Onboarding and the linked Camp
+		with QueryBudget(max_queries=8, max_docs=2, max_writes=0, label="onboarding_hooks.manage_onboarding"):
+			manage_onboarding(onboarding, "before_save")
+
+	def test_convert_lead_existing_organization(self):
+		lead = frappe._dict(
+			name="CRM-LEAD-QUERY-BUDGET",
+			company_name=self.name,
+			custom_organization_type="Camp",
+			custom_phase="Signed",
+			custom_converted_to_customer=0,
+		)
+		# One IN lookup for the existing Camp and the converted flag UPDATE
+		with QueryBudget(max_queries=2, max_docs=0, max_writes=1, label="lead_hooks.convert_lead_to_camp_and_customer"):
+			convert_lead_to_camp_and_customer(lead)
+
+	def test_convert_leads_skips_leads_without_company_name(self):
+		lead = frappe._dict(name="CRM-LEAD-NO-COMPANY", company_name="", custom_organization_type="Camp")
+		with QueryBudget(max_queries=0, max_docs=0, label="lead_hooks.convert_leads"):
+			result = convert_leads([lead])
+		self.assertEqual(result["skipped"], [lead.name])
+
+	def test_find_duplicates_many_single_query(self):
+		values = [
+			{"doctype": "Camp", "name": f"{self.name} {i}", "organization_name": f"{self.name} {i}", "phone": "555-0100"}
+			for i in range(5)
+		]
+		# One blocking key query for the whole batch
+		with QueryBudget(max_queries=1, max_docs=0, label="duplicates.find_duplicates_many"):
+			matches = find_duplicates_many(values)
+		self.assertIn(self.name, [match.name for match in matches[0]])  # Stored Camp, same phone
+		self.assertIn(values[0]["name"], [match.name for match in matches[1]])  # Earlier entry of the batch
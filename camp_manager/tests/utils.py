@@ -0,0 +1,72 @@
+# Frappe is patched for the duration of a budget to see every query and document load
+import frappe
+
+# Statements that modify data
+WRITE_PREFIXES = ("insert", "update", "delete", "replace")
+
+
+class QueryBudget:
+    """
+    Context manager that fails a test when the code inside it issues more queries or loads more documents
+    than allowed, e.g.:
+
+        with QueryBudget(max_queries=3, max_docs=0, max_writes=0):
+            organization_creation(camp, "on_update")
+
+    Every query passing through frappe.db.sql (get_value, exists, get_all, query builder, ...) is recorded,
+    as is every frappe.get_doc(doctype, name) load. The assertion message lists them, so a redundant
+    get_doc or exists call is easy to spot.
+    """
+
+    def __init__(self, max_queries=None, max_docs=None, max_writes=None, label=None):
+        self.max_queries = max_queries
+        self.max_docs = max_docs
+        self.max_writes = max_writes
+        self.label = label
+        self.queries = []
+        self.docs = []
+
+    @property
+    def writes(self):
+        """The recorded queries that insert, update or delete rows."""
+        return [query for query in self.queries if query.lstrip().lower().startswith(WRITE_PREFIXES)]
+
+    def __enter__(self):
+        self._sql = frappe.db.sql
+        self._get_doc = frappe.get_doc
+
+        def sql(query, *args, **kwargs):
+            self.queries.append(str(query))
+            return self._sql(query, *args, **kwargs)
+
+        def get_doc(*args, **kwargs):
+            doc = self._get_doc(*args, **kwargs)
+            # frappe.get_doc({...}) builds a new document; only loads by doctype and name are counted
+            if args and isinstance(args[0], str):
+                self.docs.append(f"{doc.doctype} {doc.name}")
+            return doc
+
+        frappe.db.sql = sql
+        frappe.get_doc = get_doc
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        frappe.db.sql = self._sql
+        frappe.get_doc = self._get_doc
+        if exc_type:
+            return False
+
+        problems = []
+        if self.max_queries is not None and len(self.queries) > self.max_queries:
+            problems.append(f"{len(self.queries)} queries (budget {self.max_queries})")
+        if self.max_writes is not None and len(self.writes) > self.max_writes:
+            problems.append(f"{len(self.writes)} writes (budget {self.max_writes})")
+        if self.max_docs is not None and len(self.docs) > self.max_docs:
+            problems.append(f"{len(self.docs)} documents loaded (budget {self.max_docs})")
+        if problems:
+            details = "\n".join(
+                [f"  query: {' '.join(query.split())}" for query in self.queries]
+                + [f"  get_doc: {doc}" for doc in self.docs]
+            )
+            raise AssertionError(f"{self.label or 'Query budget'} exceeded: {', '.join(problems)}\n{details}")
+        return False
@@ -1,15 +1,71 @@
 
 
-# Frappe is the core framework for ERPNext, used for database and document operations
-import frappe
 # JSON is used for reading configuration files that map countries to currencies and associations to discounts
 import json
+
 # OS is used for file path manipulations, ensuring compatibility across environments
 import os
 
+# Frappe is the core framework for ERPNext, used for database and document operations
+import frappe
+
+# Per-request cascade coordinator (re-entrancy guard, coalesced writes, cascade tree)
+from camp_manager import cascade
+
+# Cached organization -> Customer / Onboarding / Lead / Camp Settings resolver
+from camp_manager.identity import resolve
+
+# Wall time / query counters for the doc_event handlers (see get_hook_stats)
+from camp_manager.instrumentation import instrument
+
+# App logger, used instead of print() so hook messages stay out of worker stdout
+from camp_manager.logger import get_logger
+
+# Cached lookup tables for country -> currency and association -> discount
+from camp_manager.lookups import get_currency_for_country, get_discount_for_association
+
+# Cached company / receivable account resolver
+from camp_manager.receivables import (
+    debtors_account_name,
+    ensure_currency_enabled,
+    ensure_debtors_account,
+    get_default_company,
+)
+
+# Shared snapshot of the stored document, used to detect which fields changed in this save
+from camp_manager.snapshots import has_changed, same_value
+
+log = get_logger("utils")
+
+# Customer link field pointing back at each organization doctype
+CUSTOMER_LINK_FIELDS = {
+    "Camp": "custom_camp_link",
+    "Other Organization": "custom_other_organization_link",
+}
 
+# Customer fields mirrored from the organization/camp: {customer field: organization field}.
+# The six address fields are filled separately by customer_address_values().
+CUSTOMER_SYNC_FIELDS = {
+    "custom_tax_status": "tax_exempt",
+    "custom_tax_exemption_number": "tax_exemption_number",
+    "custom_discount_": "association_discount",
+    "custom_email": "email",
+    "custom_phone": "phone",
+}
+CUSTOMER_ADDRESS_FIELDS = (
+    "custom_street_address_line_1",
+    "custom_street_address_line_2",
+    "custom_city",
+    "custom_state",
+    "custom_zip_code",
+    "custom_country",
+)
 
 
+
+
+@instrument
+@cascade.cascade_hook
 def organization_hooks(doc, method):
     """
     Main entry point for organization-related hooks, called on document events.
@@ -42,38 +98,26 @@ def check_currancy(doc):
             update_currency(doc)
             return
 
-        # For existing documents, compare with the original to detect changes
-        if not hasattr(doc, "_original"):
-            doc._original = frappe.get_doc(doc.doctype, doc.name)
-            original = doc._original
-
+        # For existing documents, compare with the stored version (shared snapshot, loaded once per transaction)
         # Only update currency if the country_shipping_address has changed
-        if doc.country_shipping_address != original.country_shipping_address:
+        if has_changed(doc, "country_shipping_address"):
             update_currency(doc)
     except Exception as e:
-        # Print error for debugging, but do not interrupt workflow
-        print(f"Didn't update currancy due to: {str(e)}")
+        # Log error for debugging, but do not interrupt workflow
+        log.warning("Didn't update currency of %s %s: %s", doc.doctype, doc.name, e)
 
 
 
 def update_currency(doc):
     """
     Updates the currency field of the document based on the country_shipping_address.
-    Uses a local JSON file mapping countries to currencies, allowing for easy updates and customization.
+    Uses the cached country_currency_map.json lookup table, which is reloaded automatically when the file changes.
     If the country is not found in the mapping, defaults to USD to avoid errors in downstream processes.
     Args:
         doc: The Frappe document being processed.
     """
-    # Build the path to the country-currency mapping file (should be in the same directory)
-    file_path = os.path.join(os.path.dirname(__file__), "country_currency_map.json")
-    with open(file_path, "r") as file:
-        country_currency = json.load(file)  # Load country-currency mapping from JSON file
-        country = doc.country_shipping_address.lower()  # Normalize country name for lookup
-        currency = country_currency.get(country.lower())  # Get currency for country, case-insensitive
-        if currency:
-            doc.currency = currency  # Set currency if found in mapping
-        else:
-            doc.currency = "USD"  # Default to USD if country not found (fallback)
+    # The mapping is parsed once per process and cached; lookups are case-insensitive and accept aliases like "USA"
+    doc.currency = get_currency_for_country(doc.country_shipping_address, default="USD")
 
 
 
@@ -87,78 +131,96 @@ def update_customer_info(doc, method):
         doc: The Frappe document being processed (Camp or Other Organization).
         method: The method triggering the hook.
     """
-    customers = []  # List to hold linked customers
-    cust = None
-    if doc.doctype == "Camp":
-        # Get all customers linked to this camp via custom_camp_link field
-        if frappe.db.exists("Customer", {"custom_camp_link": doc.name}):
-            cust = frappe.get_doc("Customer", {"custom_camp_link": doc.name})
-    elif doc.doctype == "Other Organization":
-        # Get all customers linked to this organization via custom_other_organization_link field
-        if frappe.db.exists("Customer", {"custom_other_organization_link": doc.name}):
-            cust = frappe.get_doc("Customer", {"custom_other_organization_link": doc.name})
+    if doc.doctype not in CUSTOMER_LINK_FIELDS or doc.is_new():
+        return
+    # The linked Customer comes from the cached identity map; organizations without one cost no query
+    linked = resolve(doc.doctype, doc.name)
+    if not linked or not linked.customer:
+        return
+    # One primary-key read of every mirrored field
+    cust = frappe.db.get_value(
+        "Customer",
+        linked.customer,
+        ["name", "default_currency", *CUSTOMER_SYNC_FIELDS, *CUSTOMER_ADDRESS_FIELDS],
+        as_dict=True,
+    )
     # If no customers found, nothing to update
-    if cust == None:
+    if cust is None:
         return
     try:
-
-        # Update all relevant custom fields from organization/camp doc
-        cust.custom_tax_status = doc.tax_exempt  # Sync tax exemption status
-        cust.custom_tax_exemption_number = doc.tax_exemption_number  # Sync exemption number
-        cust.custom_discount_ = doc.association_discount  # Sync association discount
-        update_customer_billing_address(doc, cust)  # Update billing address fields
-        cust.custom_email = doc.email  # Sync email
-        cust.custom_phone = doc.phone  # Sync phone number
-        cust.save(ignore_permissions=True)  # Save customer document with updated info
+        desired = customer_sync_values(doc)
+        changes = {
+            fieldname: value for fieldname, value in desired.items() if not same_value(value, cust.get(fieldname))
+        }
+        if changes:
+            if frappe.conf.get("camp_manager_full_customer_save"):
+                # Full save: runs Customer validations and the Customer's own hooks
+                customer = frappe.get_doc("Customer", cust.name)
+                customer.update(changes)
+                customer.save(ignore_permissions=True)  # Save customer document with updated info
+            else:
+                # Lightweight path: one multi-column UPDATE of the fields that changed
+                cascade.set_value("Customer", cust.name, changes)
 
         # If the currency has changed, update customer currency and ensure account exists
         if cust.default_currency != doc.currency:
-            currency = frappe.get_doc("Currency", doc.currency)
-            if not currency.enabled:
-                currency.enabled = 1  # Enable currency if disabled
-                currency.save(ignore_permissions = True)
+            ensure_currency_enabled(doc.currency)  # Enable currency if disabled
 
-            first_company = frappe.get_all("Company", fields=["name"], limit=1)
-            company_name = first_company[0]["name"] if first_company else None
+            company_name = get_default_company()  # Cached company lookup
             # Set default currency for customer in DB
-            frappe.db.set_value("Customer", cust.name, "default_currency", doc.currency)
-            ensure_child_account(f"Debtors {doc.currency}", doc.currency)
+            cascade.set_value("Customer", cust.name, {"default_currency": doc.currency})
+            account = ensure_child_account(f"Debtors {doc.currency}", doc.currency)
 
-            # Enqueue async update for customer account to avoid blocking
+            # Enqueue async update for customer account to avoid blocking.
+            # Only primitive keys are passed, and the job id collapses repeat saves into the queued job.
             frappe.enqueue(
                 method=set_customer_account,
                 queue='default',
                 timeout=300,
                 is_async=True,
+                job_id=customer_account_job_id(cust.name, company_name, doc.currency),
+                deduplicate=True,
+                enqueue_after_commit=True,  # The Debtors account may have been created in this transaction
+                customer=cust.name,
                 company=company_name,
-                account_name=f"Debtors {doc.currency}",
-                doc=doc,
-                cust_name=cust.name
+                currency=doc.currency,
+                account=account
             )
     except Exception as e:
-        # Log and print errors for debugging and support
-        print(f"Failed to update customer info due to: {str(e)}")
+        # Log errors for debugging and support
+        log.warning("Failed to update customer info of %s %s: %s", doc.doctype, doc.name, e)
         frappe.log_error(frappe.get_traceback(), "Customer Info Update Error")
         frappe.msgprint(f"Failed to update customer info: {str(e)}")
 
 
 
-def set_customer_account(company, account_name, doc, cust_name):
+def customer_account_job_id(customer, company, currency):
+    """Returns the background job id used to link a customer to its receivable account."""
+    return f"camp_manager::customer_account::{customer}::{company}::{currency}"
+
+
+def set_customer_account(customer, company, currency, account=None):
     """
-    Appends a new account to the customer's accounts child table, linking the customer to the correct receivable account.
+    Links the customer to the receivable account of its currency in the customer's accounts child table.
     This is important for proper financial tracking and reporting in ERPNext, especially for multi-currency setups.
+    The job is idempotent: the row for the company is updated in place (or appended if missing), and the customer
+    is only saved when the row actually changed, so running it twice has no further effect.
     Args:
+        customer: The customer name.
         company: The company name.
-        account_name: The account name to link (should match currency).
-        doc: The organization/camp document (source of currency info).
-        cust: The customer document to update.
+        currency: The customer's currency (e.g. 'CAD').
+        account: The Debtors account to link; resolved from the currency if not given.
     """
-    # Add account entry to customer, linking to the correct company and account
-    cust = frappe.get_doc("Customer", cust_name)  # Fetch the customer document
-    cust.append("accounts", {
-        "company": company,
-        "account": f"Debtors {doc.currency} - {company[0]}"
-    })
+    account = account or ensure_debtors_account(currency, company)
+    cust = frappe.get_doc("Customer", customer)  # Fetch the customer document
+
+    row = next((row for row in cust.get("accounts") or [] if row.company == company), None)
+    if row and row.account == account:
+        return  # Already linked, nothing to save
+    if row:
+        row.account = account
+    else:
+        cust.append("accounts", {"company": company, "account": account})
     cust.save(ignore_permissions=True)  # Save customer with updated accounts
 
 
@@ -166,56 +228,17 @@ def ensure_child_account(account_name: str, currency: str):
     """
     Ensures a child account exists under Accounts Receivable for the given currency and company.
     This is essential for proper receivables tracking in multi-currency environments. If the account does not exist,
-    it is created automatically. This function is used to keep financial records consistent and prevent errors in transactions.
+    it is created automatically. The company, the Accounts Receivable parent and the accounts known to exist are
+    cached (see receivables.py), so repeat calls for the same currency do not query the database.
     Args:
         account_name: Name of the child account to ensure (e.g., 'Debtors USD').
         currency: Currency for the account (e.g., 'USD').
     Returns:
         The name of the existing or newly created account.
     """
-    # Step 1: Find the Accounts Receivable parent for this company (should be unique per company)
-    first_company = frappe.get_all("Company", fields=["name"], limit=1)
-    company_name = first_company[0]["name"] if first_company else None
-
-    # Get parent account for Accounts Receivable (must exist)
-    parent_account = frappe.get_value("Account", {
-        "name": f"Accounts Receivable - {company_name[0]}",
-        "company": company_name
-    })
-
-    # If parent account not found, raise error to prevent orphaned accounts
-    if not parent_account:
-        raise ValueError(f"Accounts Receivable parent not found for company '{company_name}'")
-    # Step 2: Check if the child account already exists to avoid duplicates
-    existing_account = frappe.db.exists("Account", {
-        "account_name": account_name,
-        "parent_account": parent_account,
-        "company": company_name
-    })
-
-    # If child account exists, return its name for reference
-    if existing_account:
-        print(f"✅ Account '{account_name}' already exists under '{parent_account}'")
-        return existing_account
-
-    # Step 3: Create the account if it doesn't exist, with correct type and currency
-    account = frappe.get_doc({
-        "doctype": "Account",
-        "account_name": account_name,
-        "parent_account": parent_account,
-        "is_group": 0,
-        "root_type": "Asset",
-        "account_type": "Receivable",
-        "account_currency": currency,
-        "company": company_name
-    })
-
-    account.insert(ignore_permissions=True)  # Insert new account into database
-    #frappe.db.commit()  # Commit if needed (usually handled by Frappe)
-
-    print(f"✅ Created new child account '{account.name}' under '{parent_account}'")
-    return account.name
-       
+    if account_name != debtors_account_name(currency):
+        raise ValueError(f"Unexpected receivable account name '{account_name}' for currency '{currency}'")
+    return ensure_debtors_account(currency)
 
 
 
@@ -251,35 +274,27 @@ def set_discount(doc, method):
         # if doc.is_new():
         #     return
 
-        original = None
-        # Retrieve original document for comparison, to detect association changes
-        if not doc.is_new() and not hasattr(doc, "_original"):
-            doc._original = frappe.get_doc(doc.doctype, doc.name)
-            original = doc._original
-
-        # If association changed or original is missing, update discount from JSON
-        if original == None or (original.association != doc.association) and doc.association:
-            file_path = os.path.join(os.path.dirname(__file__), "discounts.json")
-
-            with open(file_path, "r") as file:
-                association_discounts = json.load(file)  # Load discounts from JSON file
-
-                if doc.association in association_discounts:
-                    doc.association_discount = association_discounts[doc.association]  # Set discount if found
+        # If the document is new or the association changed, update discount from JSON
+        # (the comparison uses the shared snapshot of the stored document)
+        if doc.is_new() or (doc.association and has_changed(doc, "association")):
+            # Discounts come from the cached discounts.json lookup table (reloaded when the file changes)
+            discount = get_discount_for_association(doc.association)
+            if discount is not None:
+                doc.association_discount = discount  # Set discount if found
 
     except FileNotFoundError as fne:
         # Handle missing discounts.json file gracefully, log for admin review
-        print(f"Failed due to FileNotFoundError: {str(fne)}")
+        log.warning("discounts.json not found: %s", fne, sample=True)
         frappe.log_error("Could not find discounts.json", "Discount Error")
 
     except json.JSONDecodeError as jsnde:
         # Handle invalid JSON format, log for admin review
-        print(f"Failed due to json.JSONDecodeError: {str(jsnde)}")
+        log.warning("Invalid JSON in discounts.json: %s", jsnde, sample=True)
         frappe.log_error("Invalid JSON format in discounts.json", "Discount Error")
 
     except Exception as e:
         # Log any other errors for debugging and support
-        print(f"Failed due to: {str(e)}")
+        log.warning("set_discount failed for %s %s: %s", doc.doctype, doc.name, e)
         frappe.log_error(frappe.get_traceback(), "Unexpected error in set_discount")
 
 
@@ -287,14 +302,29 @@ def set_discount(doc, method):
 
 
 
-def update_customer_billing_address(doc, cust):
+def customer_sync_values(doc):
     """
-    Updates the billing address fields on the customer document from the organization/camp document.
+    Returns the values the linked Customer should hold for the fields mirrored from the organization/camp.
+    Args:
+        doc: The organization/camp document.
+    Returns:
+        dict: {customer fieldname: value} for tax status, exemption number, discount, email, phone and,
+        when a complete address is available, the six address fields.
+    """
+    values = {fieldname: doc.get(source) for fieldname, source in CUSTOMER_SYNC_FIELDS.items()}
+    values.update(customer_address_values(doc))
+    return values
+
+
+def customer_address_values(doc):
+    """
+    Returns the billing address fields for the customer from the organization/camp document.
     Prefers billing address fields, falls back to shipping address if billing is incomplete or missing.
     This ensures that customer records always have a valid address for billing and communication, reducing errors in invoices and correspondence.
     Args:
         doc: The organization/camp document (source of address info).
-        cust: The customer document to update.
+    Returns:
+        dict: {customer address fieldname: value}, empty if neither address is complete.
     """
     # Prepare the new address by collecting all required fields
     parts = []
@@ -319,15 +349,20 @@ def update_customer_billing_address(doc, cust):
             doc.country_shipping_address
         ]
 
-    # Assign address fields to customer if all are present (must be exactly 6 fields)
-    for i in range(0, len(parts)):
-        if len(parts) == 6:
-            cust.custom_street_address_line_1 = parts[0]
-            cust.custom_street_address_line_2 = parts[1]
-            cust.custom_city = parts[2]
-            cust.custom_state = parts[3]
-            cust.custom_zip_code = parts[4]
-            cust.custom_country = parts[5]
+    # Address fields are only assigned when a complete address was found (must be exactly 6 fields)
+    if not parts:
+        return {}
+    return dict(zip(CUSTOMER_ADDRESS_FIELDS, parts, strict=True))
+
+
+def update_customer_billing_address(doc, cust):
+    """
+    Updates the billing address fields on the customer document from the organization/camp document.
+    Args:
+        doc: The organization/camp document (source of address info).
+        cust: The customer document to update.
+    """
+    cust.update(customer_address_values(doc))
 
 
 